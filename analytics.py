@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from collections import Counter
+
+import database as db
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class StatsAggregator:
+    """Счетчики просмотров и открытий контактов в памяти процесса.
+
+    Обработчики только увеличивают словари; накопленные приращения раз в interval
+    секунд записываются в vacancy_stats одной транзакцией (и при остановке).
+    """
+
+    def __init__(self):
+        self.views = Counter()
+        self.contacts = Counter()
+        self._task = None
+
+    def record_view(self, vacancy_id: int):
+        self.views[vacancy_id] += 1
+
+    def record_contact(self, vacancy_id: int):
+        self.contacts[vacancy_id] += 1
+
+    async def flush(self):
+        """Запись накопленных приращений в базу"""
+        if not self.views and not self.contacts:
+            return
+        views, contacts = self.views, self.contacts
+        self.views, self.contacts = Counter(), Counter()
+        deltas = [
+            (vacancy_id, views[vacancy_id], contacts[vacancy_id])
+            for vacancy_id in views.keys() | contacts.keys()
+        ]
+        try:
+            await db.add_vacancy_stats(deltas)
+        except Exception:
+            # Возвращаем приращения, чтобы записать их при следующей попытке
+            self.views.update(views)
+            self.contacts.update(contacts)
+            raise
+        metrics.inc("stats_flushed_rows_total", len(deltas))
+
+    async def _flush_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Ошибка записи статистики просмотров: %s", e)
+
+    def start(self, interval: float = 5.0):
+        self._task = asyncio.create_task(self._flush_loop(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+
+aggregator = StatsAggregator()
+record_view = aggregator.record_view
+record_contact = aggregator.record_contact
+
+
+def _collect_metrics():
+    metrics.set_gauge("stats_pending_vacancies", len(aggregator.views.keys() | aggregator.contacts.keys()))
+
+
+metrics.register_collector(_collect_metrics)
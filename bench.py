@@ -0,0 +1,315 @@
+"""Нагрузочный тест: синтетические обновления через handlers.router без обращения к Telegram.
+
+Примеры:
+    python bench.py --vacancies 100000 --users 2000
+    python bench.py --scenario paginate --pages 50 --json baseline.json
+    python bench.py --scenario paginate --compare baseline.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+# Лимиты обработки берутся из config, а он требует токен; к Telegram бенчмарк не обращается
+os.environ.setdefault("BOT_TOKEN", "123456:BENCHMARK")
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import EditMessageText, SendMessage, TelegramMethod
+from aiogram.types import CallbackQuery, Chat, InlineKeyboardMarkup, Message, Update, User
+
+import database as db
+import metrics
+from normalize import vacancy_fields
+from pool import ConnectionPool
+from storage import SQLiteStorage
+from throttling import ConcurrencyMiddleware
+
+SCENARIOS = ("start", "register", "vacancy", "paginate", "mixed")
+
+CITIES = ("Москва", "Санкт-Петербург", "Казань", "Новосибирск", "Удаленно", "Москва (удаленно)")
+TITLES = ("Python Developer", "Go Engineer", "Data Scientist", "QA Engineer", "DevOps Engineer",
+          "Frontend Developer", "Product Manager", "Android Developer", "Аналитик данных")
+SKILLS = ("Python", "Django", "FastAPI", "PostgreSQL", "Docker", "Kubernetes", "React", "TypeScript",
+          "Go", "Kafka", "Redis", "Linux", "CI/CD", "SQL", "pandas", "Java", "Kotlin")
+
+
+class FakeSession(BaseSession):
+    """Сессия бота без сети: отвечает на методы API правдоподобными результатами
+    и запоминает последнюю inline-клавиатуру в каждом чате"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        self.markups = {}
+        self._message_ids = itertools.count(1)
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout=None):
+        self.calls += 1
+        if isinstance(method, (SendMessage, EditMessageText)):
+            if isinstance(method.reply_markup, InlineKeyboardMarkup):
+                self.markups[method.chat_id] = method.reply_markup
+            return Message(
+                message_id=next(self._message_ids),
+                date=datetime.now(),
+                chat=Chat(id=method.chat_id or 0, type="private"),
+                text=method.text,
+            )
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+class Simulator:
+    """Генерация обновлений от имени пользователей и замер времени их обработки"""
+
+    def __init__(self, dp: Dispatcher, bot: Bot, session: FakeSession):
+        self.dp = dp
+        self.bot = bot
+        self.session = session
+        self.latencies = []
+        self.errors = 0
+        self._ids = itertools.count(1)
+
+    def _user(self, user_id: int):
+        return User(id=user_id, is_bot=False, first_name="Bench", username=f"bench{user_id}")
+
+    async def _feed(self, update: Update):
+        started = time.perf_counter()
+        try:
+            await self.dp.feed_update(self.bot, update)
+        except Exception:
+            self.errors += 1
+        self.latencies.append(time.perf_counter() - started)
+
+    async def message(self, user_id: int, text: str):
+        await self._feed(Update(
+            update_id=next(self._ids),
+            message=Message(
+                message_id=next(self._ids),
+                date=datetime.now(),
+                chat=Chat(id=user_id, type="private"),
+                from_user=self._user(user_id),
+                text=text,
+            ),
+        ))
+
+    async def callback(self, user_id: int, data: str):
+        await self._feed(Update(
+            update_id=next(self._ids),
+            callback_query=CallbackQuery(
+                id=str(next(self._ids)),
+                from_user=self._user(user_id),
+                chat_instance=str(user_id),
+                data=data,
+                message=Message(
+                    message_id=1,
+                    date=datetime.now(),
+                    chat=Chat(id=user_id, type="private"),
+                    text="bench",
+                ),
+            ),
+        ))
+
+    def _next_page_callback(self, user_id: int):
+        markup = self.session.markups.get(user_id)
+        if markup is None:
+            return None
+        for button in markup.inline_keyboard[0]:
+            if button.text.startswith("Вперед"):
+                return button.callback_data
+        return None
+
+    async def run_start(self, user_id: int):
+        await self.message(user_id, "/start")
+
+    async def run_register(self, user_id: int):
+        await self.message(user_id, "/start")
+        await self.message(user_id, "🔍 Я рекрутер (ищу вакансии)")
+
+    async def run_vacancy(self, user_id: int):
+        await self.message(user_id, "👔 Я компания (нанимаю)")
+        await self.message(user_id, f"Bench Company {user_id}")
+        await self.message(user_id, f"@company{user_id}")
+        await self.message(user_id, "➕ Опубликовать вакансию")
+        await self.message(user_id, random.choice(TITLES))
+        await self.message(user_id, ", ".join(random.sample(SKILLS, 5)))
+        await self.message(user_id, "150,000 - 250,000 руб")
+        await self.message(user_id, random.choice(CITIES))
+
+    async def run_paginate(self, user_id: int, pages: int):
+        await self.run_register(user_id)
+        await self.message(user_id, "📝 Смотреть вакансии")
+        for _ in range(pages):
+            data = self._next_page_callback(user_id)
+            if data is None:
+                break
+            await self.callback(user_id, data)
+
+    async def run_user(self, scenario: str, user_id: int, pages: int):
+        if scenario == "mixed":
+            scenario = random.choices(("start", "register", "vacancy", "paginate"), (1, 1, 1, 4))[0]
+        if scenario == "start":
+            await self.run_start(user_id)
+        elif scenario == "register":
+            await self.run_register(user_id)
+        elif scenario == "vacancy":
+            await self.run_vacancy(user_id)
+        else:
+            await self.run_paginate(user_id, pages)
+
+
+async def seed_vacancies(target: int, chunk_size: int = 10000):
+    """Дополнение таблицы vacancies синтетическими заявками до target строк"""
+    existing = await db.get_vacancies_count()
+    missing = target - existing
+    if missing <= 0:
+        return existing
+
+    started = time.perf_counter()
+    base_time = datetime.now() - timedelta(days=30)
+    step = timedelta(days=30) / max(missing, 1)
+    inserted = 0
+    async with db.pool.writer() as conn:
+        while inserted < missing:
+            batch = []
+            for i in range(inserted, min(inserted + chunk_size, missing)):
+                low = random.randrange(50, 400) * 1000
+                salary = f"{low:,} - {low + 100000:,} руб"
+                location = random.choice(CITIES)
+                batch.append((
+                    random.randrange(1, 10000), random.choice(TITLES),
+                    "Требования: " + ", ".join(random.sample(SKILLS, 6)),
+                    salary, location, f"@hr{i}", (base_time + step * i).isoformat(),
+                    *vacancy_fields(salary, location),
+                ))
+            await conn.executemany("""
+                INSERT INTO vacancies (company_id, title, description, salary, location, contact, created_at,
+                                       salary_min, salary_max, salary_currency, city, is_remote)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, batch)
+            inserted += len(batch)
+        await conn.commit()
+
+    print(f"Добавлено {inserted} заявок за {time.perf_counter() - started:.1f} с")
+    db.filtered_count_cache.clear()
+    return target
+
+
+def percentile(ordered: list, q: float):
+    if not ordered:
+        return 0.0
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def report(simulator: Simulator, elapsed: float, session: FakeSession):
+    ordered = sorted(simulator.latencies)
+    # Исключения обработчиков гасит handlers.handle_error, до feed_update они не доходят:
+    # их считает middleware метрик
+    handler_errors = {
+        dict(labels)["handler"]: int(value)
+        for (name, labels), value in metrics.registry.counters.items()
+        if name == "bot_handler_errors_total"
+    }
+    result = {
+        "updates": len(ordered),
+        "errors": simulator.errors + sum(handler_errors.values()),
+        "handler_errors": handler_errors,
+        "api_calls": session.calls,
+        "seconds": round(elapsed, 3),
+        "updates_per_sec": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        "user_cache": db.user_cache.stats(),
+    }
+    return result
+
+
+async def run(args):
+    db.pool = ConnectionPool(args.db)
+    await db.pool.open(readers=args.readers)
+    await db.init_db()
+    await seed_vacancies(args.vacancies)
+
+    from handlers import pagination_middleware, router
+    # Симулятор листает без пауз, поэтому ограничение частоты по умолчанию отключено
+    pagination_middleware.throttle = args.throttle
+    session = FakeSession()
+    bot = Bot(token="123456:BENCHMARK", session=session)
+    storage = SQLiteStorage(db.pool) if args.storage == "sqlite" else MemoryStorage()
+    dp = Dispatcher(storage=storage)
+    dp.include_router(router)
+    metrics.setup_middlewares(dp)
+    if args.max_concurrent:
+        dp.update.outer_middleware(ConcurrencyMiddleware(args.max_concurrent))
+
+    simulator = Simulator(dp, bot, session)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    # Отдельный диапазон id, чтобы не пересекаться с реальными пользователями в базе
+    first_user_id = 10 ** 9 + random.randrange(10 ** 6) * 10 ** 5
+
+    async def one_user(user_id: int):
+        async with semaphore:
+            await simulator.run_user(args.scenario, user_id, args.pages)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_user(first_user_id + i) for i in range(args.users)))
+    elapsed = time.perf_counter() - started
+
+    result = report(simulator, elapsed, session)
+    await db.pool.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест обработчиков бота")
+    parser.add_argument("--db", default="bench_data.db", help="файл базы данных для теста")
+    parser.add_argument("--vacancies", type=int, default=10000, help="сколько заявок должно быть в базе")
+    parser.add_argument("--users", type=int, default=1000, help="количество симулируемых пользователей")
+    parser.add_argument("--concurrency", type=int, default=500, help="одновременно активных пользователей")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="mixed")
+    parser.add_argument("--pages", type=int, default=20, help="перелистываний на пользователя")
+    parser.add_argument("--readers", type=int, default=4, help="читающих соединений в пуле")
+    parser.add_argument("--storage", choices=("memory", "sqlite"), default="memory", help="хранилище FSM")
+    parser.add_argument("--throttle", action="store_true", help="ограничивать частоту листания, как для живых пользователей")
+    parser.add_argument("--max-concurrent", type=int, default=0,
+                        help="ограничить число одновременно выполняемых обработчиков (0 - без ограничения)")
+    parser.add_argument("--json", help="сохранить результат в JSON (например, как базовую линию)")
+    parser.add_argument("--compare", help="сравнить с ранее сохраненным JSON")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    result = asyncio.run(run(args))
+
+    print(f"Сценарий: {args.scenario}, пользователей: {args.users}, заявок: {args.vacancies}")
+    for key, value in result.items():
+        print(f"  {key}: {value}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print("Сравнение с базовой линией:")
+        for key in ("updates_per_sec", "p50_ms", "p95_ms", "p99_ms"):
+            before, after = baseline.get(key), result[key]
+            if before:
+                print(f"  {key}: {before} -> {after} ({(after - before) / before * 100:+.1f}%)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import re
+
+import metrics
+from cache import LRUCache
+
+# Сколько вакансий подгружать вперед по направлению листания
+PREFETCH_AHEAD = 5
+
+# Отрисованные карточки по (id, version, show_contact): смена версии вакансии дает новый ключ
+card_cache = LRUCache(maxsize=5000, ttl=3600)
+
+# Окна предзагрузки по chat_id. Короткий TTL ограничивает устаревание строк
+windows = LRUCache(maxsize=10000, ttl=30)
+
+# Inline-поиск: результатов в одном ответе и время жизни выдачи. Столько же секунд
+# ответ кэширует Telegram (cache_time), поэтому популярные запросы не доходят даже до бота
+INLINE_PAGE_SIZE = 50
+INLINE_CACHE_TTL = 60
+
+# Выдача inline-поиска по (нормализованный запрос, смещение) -> (rows, total_count)
+inline_results = LRUCache(maxsize=2000, ttl=INLINE_CACHE_TTL)
+
+
+def render_card(vacancy, show_contact: bool = True) -> str:
+    """HTML-карточка вакансии без строки с номером страницы"""
+    key = (vacancy['id'], vacancy['version'], show_contact)
+    card = card_cache.get(key)
+    if card is None:
+        card = (
+            f"📌 <b>{vacancy['title']}</b>\n\n"
+            f"💰 Зарплата: {vacancy['salary']}\n"
+            f"📍 Локация: {vacancy['location']}\n\n"
+            f"📝 Описание:\n{vacancy['description']}"
+        )
+        if show_contact:
+            card += f"\n\n📞 Контакт: {vacancy['contact']}"
+        card_cache.set(key, card)
+    return card
+
+
+def filters_key(filters: dict = None):
+    """Хешируемое представление фильтров для сравнения окон"""
+    return tuple(sorted((filters or {}).items()))
+
+
+class PrefetchWindow:
+    """Непрерывный отрезок списка вакансий, начиная со страницы start_page"""
+
+    __slots__ = ("start_page", "rows", "filters")
+
+    def __init__(self, start_page: int, rows: list, filters: tuple):
+        self.start_page = start_page
+        self.rows = rows
+        self.filters = filters
+
+    def _row(self, page: int):
+        index = page - self.start_page
+        if 0 <= index < len(self.rows):
+            return self.rows[index]
+        return None
+
+    def lookup(self, page: int, direction: str, cursor: tuple):
+        """Вакансия для страницы, если окно содержит и ее, и показанную вакансию-ключ"""
+        shown = self._row(page - 1 if direction == "n" else page + 1)
+        if shown is None or (shown['created_at'], shown['id']) != tuple(cursor):
+            return None
+        return self._row(page)
+
+
+def get_cached_page(chat_id: int, page: int, direction: str, cursor: tuple, filters: dict = None):
+    """Вакансия из окна предзагрузки чата или None"""
+    window = windows.get(chat_id)
+    row = None
+    if window is not None and cursor is not None and window.filters == filters_key(filters):
+        row = window.lookup(page, direction, cursor)
+    metrics.inc("prefetch_lookups_total", result="hit" if row is not None else "miss")
+    return row
+
+
+def store_window(chat_id: int, start_page: int, rows: list, filters: dict = None):
+    """Сохранение загруженных вакансий как окна предзагрузки чата"""
+    if rows:
+        windows.set(chat_id, PrefetchWindow(start_page, list(rows), filters_key(filters)))
+
+
+def normalize_query(text: str) -> str:
+    """Запрос inline-поиска в виде ключа кэша: "  Python, МОСКВА" -> "python москва".
+    Знаки препинания отбрасываются так же, как при построении запроса FTS5"""
+    return " ".join(re.findall(r"\w+", (text or "").lower()))
+
+
+def get_inline_page(query: str, offset: int):
+    """Закэшированная выдача inline-поиска или None"""
+    page = inline_results.get((query, offset))
+    metrics.inc("inline_cache_lookups_total", result="hit" if page is not None else "miss")
+    return page
+
+
+def store_inline_page(query: str, offset: int, rows: list, total_count: int):
+    inline_results.set((query, offset), (list(rows), total_count))
+
+
+def invalidate_listings():
+    """Сброс окон предзагрузки и inline-выдачи после массового снятия или удаления заявок:
+    иначе до истечения TTL листание и inline-поиск показывают уже удаленные вакансии"""
+    windows.clear()
+    inline_results.clear()
+
+
+def _collect_metrics():
+    for name, cache in (("cards", card_cache), ("prefetch_windows", windows), ("inline_results", inline_results)):
+        stats = cache.stats()
+        metrics.set_gauge("cache_entries", stats["size"], cache=name)
+        metrics.set_gauge("cache_hits", stats["hits"], cache=name)
+        metrics.set_gauge("cache_misses", stats["misses"], cache=name)
+
+
+metrics.register_collector(_collect_metrics)
@@ -0,0 +1,252 @@
+"""Потоковый импорт и экспорт заявок и пользователей в CSV/JSONL.
+
+Примеры:
+    python cli.py import vacancies dump.jsonl
+    python cli.py import users users.csv --chunk 50000
+    python cli.py export vacancies vacancies.csv
+    python cli.py export users - --format jsonl > users.jsonl
+"""
+import argparse
+import asyncio
+import csv
+import functools
+import json
+import sys
+import time
+from datetime import datetime
+
+import database as db
+import migrations
+from normalize import vacancy_fields
+from pool import ConnectionPool
+
+# Колонки, которые читаются из файла при импорте
+IMPORT_COLUMNS = {
+    "vacancies": ("company_id", "title", "description", "salary", "location", "contact", "created_at"),
+    "users": ("user_id", "username", "user_type", "company_name", "contact", "created_at"),
+}
+
+EXPORT_COLUMNS = {
+    "vacancies": ("id",) + IMPORT_COLUMNS["vacancies"],
+    "users": IMPORT_COLUMNS["users"],
+}
+
+INSERT_SQL = {
+    "vacancies": """
+        INSERT INTO vacancies (company_id, title, description, salary, location, contact, created_at,
+                               salary_min, salary_max, salary_currency, city, is_remote)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    "users": """
+        INSERT OR REPLACE INTO users (user_id, username, user_type, company_name, contact, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+}
+
+# Длинные описания не должны упираться в лимит поля модуля csv (128 КБ по умолчанию)
+csv.field_size_limit(16 * 1024 * 1024)
+
+
+def detect_format(path: str, fmt: str = None):
+    """Формат файла по явному параметру или расширению"""
+    if fmt:
+        return fmt
+    if path.endswith(".csv"):
+        return "csv"
+    if path.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    raise SystemExit(f"Не удалось определить формат {path!r}, укажите --format")
+
+
+def read_records(stream, fmt: str):
+    """Построчное чтение записей-словарей"""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _int_or_none(value):
+    return int(value) if value not in (None, "") else None
+
+
+def _timestamp(value, now: str):
+    """created_at в формате datetime.isoformat() локального времени: по нему строками
+    сравниваются ключи пагинации и срок хранения. None, если значение не разобрать"""
+    if value in (None, ""):
+        return now
+    try:
+        moment = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment.isoformat()
+
+
+# Зарплаты и локации в выгрузках сильно повторяются: разбор кэшируется
+_vacancy_fields = functools.lru_cache(maxsize=65536)(vacancy_fields)
+
+
+def _vacancy_row(record: dict, now: str):
+    created_at = _timestamp(record.get("created_at"), now)
+    if created_at is None:
+        return None
+    try:
+        company_id = _int_or_none(record.get("company_id"))
+    except (TypeError, ValueError):
+        return None
+    salary, location = record.get("salary"), record.get("location")
+    return (
+        company_id, record.get("title"), record.get("description"),
+        salary, location, record.get("contact"), created_at,
+        *_vacancy_fields(salary, location),
+    )
+
+
+def _user_row(record: dict, now: str):
+    created_at = _timestamp(record.get("created_at"), now)
+    if created_at is None:
+        return None
+    try:
+        user_id = _int_or_none(record.get("user_id"))
+    except (TypeError, ValueError):
+        return None
+    return (
+        user_id, record.get("username"), record.get("user_type"),
+        record.get("company_name"), record.get("contact"), created_at,
+    )
+
+
+ROW_BUILDERS = {"vacancies": _vacancy_row, "users": _user_row}
+
+
+async def import_table(table: str, records, chunk_size: int = 10000, signatures: bool = False):
+    """Импорт записей порциями по chunk_size в одной транзакции; возвращает количество строк"""
+    build_row = ROW_BUILDERS[table]
+    now = datetime.now().isoformat()
+    records = iter(records)
+    total = 0
+    skipped = 0
+    
+    def next_chunk():
+        """Следующие chunk_size разобранных строк; записи с неразборчивой датой или id пропускаются"""
+        nonlocal skipped
+        rows = []
+        for record in records:
+            row = build_row(record, now)
+            if row is None:
+                skipped += 1
+                continue
+            rows.append(row)
+            if len(rows) == chunk_size:
+                break
+        return rows
+    
+    async with db.pool.writer() as conn:
+        # Явная транзакция: иначе sqlite3 фиксирует DROP TRIGGER сразу, и при ошибке импорта
+        # триггеры остались бы снятыми
+        await conn.execute("BEGIN IMMEDIATE")
+        if table == "vacancies":
+            # Построчные триггеры счетчика и FTS в несколько раз замедляют загрузку:
+            # снимаем их внутри транзакции и обновляем счетчик и индекс одним запросом в конце
+            async with conn.execute("SELECT COALESCE(MAX(id), 0) FROM vacancies") as cursor:
+                last_id = (await cursor.fetchone())[0]
+            await conn.execute("DROP TRIGGER IF EXISTS trg_vacancies_count_insert")
+            await conn.execute("DROP TRIGGER IF EXISTS trg_vacancies_fts_insert")
+
+        while chunk := next_chunk():
+            await conn.executemany(INSERT_SQL[table], chunk)
+            total += len(chunk)
+            print(f"\r{table}: {total}", end="", file=sys.stderr, flush=True)
+
+        if table == "vacancies":
+            await conn.execute("""
+                INSERT INTO vacancies_fts (rowid, title, description, location)
+                SELECT id, title, description, location FROM vacancies WHERE id > ?
+            """, (last_id,))
+            await conn.execute("UPDATE counters SET value = value + ? WHERE name = 'vacancies'", (total,))
+            await conn.execute(migrations.COUNT_INSERT_TRIGGER)
+            await conn.execute(migrations.FTS_INSERT_TRIGGER)
+            if signatures:
+                await migrations.backfill_minhash(conn)
+        await conn.commit()
+    print(file=sys.stderr)
+    if skipped:
+        print(f"Пропущено строк с неразборчивой датой created_at или id: {skipped}", file=sys.stderr)
+    return total
+
+
+async def export_table(table: str, stream, fmt: str, chunk_size: int = 10000):
+    """Выгрузка таблицы порциями по chunk_size; возвращает количество строк"""
+    columns = EXPORT_COLUMNS[table]
+    writer = None
+    if fmt == "csv":
+        writer = csv.writer(stream)
+        writer.writerow(columns)
+
+    total = 0
+    async with db.pool.reader() as conn:
+        async with conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY rowid") as cursor:
+            while True:
+                rows = await cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                if writer is not None:
+                    writer.writerows(tuple(row) for row in rows)
+                else:
+                    stream.writelines(
+                        json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows
+                    )
+                total += len(rows)
+    return total
+
+
+async def run(args):
+    db.pool = ConnectionPool(args.db)
+    await db.pool.open(readers=1)
+    await db.init_db()
+
+    fmt = detect_format(args.path, args.format)
+    started = time.perf_counter()
+    try:
+        if args.command == "import":
+            if args.path == "-":
+                total = await import_table(args.table, read_records(sys.stdin, fmt), args.chunk, args.signatures)
+            else:
+                with open(args.path, encoding="utf-8", newline="") as f:
+                    total = await import_table(args.table, read_records(f, fmt), args.chunk, args.signatures)
+        else:
+            if args.path == "-":
+                total = await export_table(args.table, sys.stdout, fmt, args.chunk)
+            else:
+                with open(args.path, "w", encoding="utf-8", newline="") as f:
+                    total = await export_table(args.table, f, fmt, args.chunk)
+    finally:
+        await db.pool.close()
+
+    elapsed = time.perf_counter() - started
+    action = "Импортировано" if args.command == "import" else "Выгружено"
+    print(f"{action} строк: {total} за {elapsed:.1f} с ({total / elapsed if elapsed else 0:.0f} строк/с)",
+          file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Импорт и экспорт заявок и пользователей")
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("table", choices=tuple(IMPORT_COLUMNS))
+    parser.add_argument("path", help="файл CSV/JSONL или - для stdin/stdout")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="по умолчанию - по расширению файла")
+    parser.add_argument("--db", default=db.DB_PATH, help="файл базы данных")
+    parser.add_argument("--chunk", type=int, default=10000, help="строк в одной порции")
+    parser.add_argument("--signatures", action="store_true",
+                        help="сразу построить MinHash-подписи импортированных заявок "
+                             "(иначе их построит фоновое обслуживание запущенного бота)")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,3 +7,65 @@ BOT_TOKEN = os.getenv("BOT_TOKEN")
 
 if not BOT_TOKEN:
     raise ValueError("BOT_TOKEN не установлен в .env файле")
+
+# Количество читающих соединений в пуле SQLite
+DB_READERS = int(os.getenv("DB_READERS", "4"))
+
+# Групповая фиксация записей пользователей и заявок: операций в одной транзакции
+# и сколько секунд ждать попутных операций перед COMMIT
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "64"))
+WRITE_BATCH_DELAY = float(os.getenv("WRITE_BATCH_DELAY", "0.005"))
+
+# Обработка обновлений: одновременно выполняемых обработчиков, ожидающих обновлений одного
+# пользователя и ожидающих всего; сверх лимитов нажатия получают ответ "бот перегружен"
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", "64"))
+USER_QUEUE_SIZE = int(os.getenv("USER_QUEUE_SIZE", "5"))
+OVERLOAD_QUEUE_SIZE = int(os.getenv("OVERLOAD_QUEUE_SIZE", "500"))
+
+# Режим получения обновлений: polling или webhook
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+
+# Настройки webhook. WEBHOOK_URL - публичный адрес (например, https://bot.example.com);
+# если он не задан, сервер только слушает локальный адрес (удобно для отладки)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBAPP_HOST = os.getenv("WEBAPP_HOST", "127.0.0.1")
+WEBAPP_PORT = int(os.getenv("WEBAPP_PORT", "8080"))
+
+if BOT_MODE not in ("polling", "webhook"):
+    raise ValueError("BOT_MODE должен быть polling или webhook")
+
+# Хранилище состояний FSM: sqlite (переживает перезапуск) или memory
+FSM_STORAGE = os.getenv("FSM_STORAGE", "sqlite")
+
+# Количество процессов-воркеров. При значении больше 1 обновления распределяются
+# супервизором по воркерам по user_id
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "1"))
+
+# Метрики: локальный эндпоинт /metrics в формате Prometheus (0 - отключен)
+# и интервал сводки в логе в секундах (0 - отключена). Воркеры используют порты METRICS_PORT + 1 + N
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+METRICS_LOG_INTERVAL = float(os.getenv("METRICS_LOG_INTERVAL", "60"))
+
+# Уведомления подписчикам о новых вакансиях: общий лимит отправки (сообщений в секунду)
+# и лимит на один чат
+NOTIFY_GLOBAL_RATE = float(os.getenv("NOTIFY_GLOBAL_RATE", "25"))
+NOTIFY_CHAT_RATE = float(os.getenv("NOTIFY_CHAT_RATE", "1"))
+
+# Как часто записывать накопленные просмотры и открытия контактов в базу (секунды)
+STATS_FLUSH_INTERVAL = float(os.getenv("STATS_FLUSH_INTERVAL", "5"))
+
+# Хранение заявок: старше VACANCY_RETENTION_DAYS дней переносятся в архив (0 - не переносить).
+# VACUUM и ANALYZE выполняются в окно низкой нагрузки MAINTENANCE_HOURS (часы локального времени)
+VACANCY_RETENTION_DAYS = int(os.getenv("VACANCY_RETENTION_DAYS", "60"))
+MAINTENANCE_HOURS = os.getenv("MAINTENANCE_HOURS", "3-5")
+
+# Логирование: файл, уровень, ротация (daily - ежедневно, size - по размеру) и JSON-формат
+LOG_FILE = os.getenv("LOG_FILE", "bot.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_ROTATION = os.getenv("LOG_ROTATION", "daily")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "14"))
+LOG_JSON = os.getenv("LOG_JSON", "0") == "1"
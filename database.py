@@ -1,134 +1,785 @@
-import aiosqlite
 import logging
+import re
+import time
 from datetime import datetime
 
+import dedup
+import metrics
+import migrations
+from cache import LRUCache
+from migrations import SALARY_TOP
+from normalize import normalize_city, vacancy_fields
+from pool import ConnectionPool
+from writer import GroupCommitWriter
+
 logger = logging.getLogger(__name__)
 
 DB_PATH = "bot_data.db"
 
+# Общий пул соединений; открывается в main.py при старте и закрывается при остановке
+pool = ConnectionPool(DB_PATH)
+
+# Очередь записей пользователей и заявок с групповой фиксацией; запускается в main.py.
+# Пока она не запущена (CLI, bench.py), каждая запись фиксируется отдельной транзакцией
+write_queue = GroupCommitWriter()
+
+
+class UserRecord:
+    """Компактная запись пользователя для кэша (доступ как к aiosqlite.Row: user['user_type'])"""
+
+    __slots__ = ("user_id", "username", "user_type", "company_name", "contact", "created_at")
+
+    def __init__(self, user_id: int, username: str, user_type: str,
+                 company_name: str = None, contact: str = None, created_at: str = None):
+        self.user_id = user_id
+        self.username = username
+        self.user_type = user_type
+        self.company_name = company_name
+        self.contact = contact
+        self.created_at = created_at
+
+    def __getitem__(self, key: str):
+        return getattr(self, key)
+
+    def keys(self):
+        return self.__slots__
+
+
+# Кэш пользователей со сквозной записью: save_user обновляет его после фиксации
+user_cache = LRUCache(maxsize=10000, ttl=300)
+
+# Количество заявок по фильтрам: точный COUNT(*) по индексу дорог на больших таблицах
+filtered_count_cache = LRUCache(maxsize=1000, ttl=30)
+
+# До скольких подходящих по зарплате заявок страница выбирается по индексу зарплаты
+# с сортировкой; при большем числе быстрее идти по индексу created_at
+SALARY_INDEX_MAX_ROWS = 1000
+
+# Результаты полнотекстового поиска: упорядоченные id по выражению FTS5. Листание выдачи
+# берет страницы из списка, не выполняя поиск заново
+SEARCH_RESULTS_LIMIT = 1000
+search_cache = LRUCache(maxsize=1000, ttl=60)
+
+# Сколько совпадений еще ранжируется BM25. Его IDF требует прохода по всем вхождениям
+# слов запроса, поэтому выдача по частым словам упорядочивается по новизне (rowid)
+SEARCH_RANK_LIMIT = 2000
+
+# Общее количество заявок в памяти процесса. Короткий TTL нужен, чтобы подхватывать
+# изменения, сделанные другими процессами
+VACANCY_COUNT_TTL = 5.0
+_vacancy_count = None
+_vacancy_count_expires = 0.0
+
+
+def _collect_cache_metrics():
+    """Размер и попадания кэшей для эндпоинта метрик"""
+    for name, cache in (("users", user_cache), ("filtered_counts", filtered_count_cache),
+                        ("search_results", search_cache)):
+        stats = cache.stats()
+        metrics.set_gauge("cache_entries", stats["size"], cache=name)
+        metrics.set_gauge("cache_hits", stats["hits"], cache=name)
+        metrics.set_gauge("cache_misses", stats["misses"], cache=name)
+    metrics.set_gauge("db_write_queue_depth", write_queue.depth())
+
+
+metrics.register_collector(_collect_cache_metrics)
+
+
+def _remember_vacancy_count(value: int):
+    global _vacancy_count, _vacancy_count_expires
+    _vacancy_count = value
+    _vacancy_count_expires = time.monotonic() + VACANCY_COUNT_TTL
+
 
 async def init_db():
-    """Инициализация базы данных с тестовыми данными"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        # Таблица пользователей
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                user_type TEXT,
-                company_name TEXT,
-                contact TEXT,
-                created_at TEXT
-            )
-        """)
-        
-        # Таблица заявок
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS vacancies (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                company_id INTEGER,
-                title TEXT,
-                description TEXT,
-                salary TEXT,
-                location TEXT,
-                contact TEXT,
-                created_at TEXT,
-                FOREIGN KEY (company_id) REFERENCES users (user_id)
-            )
-        """)
-        
+    """Приведение схемы базы к актуальной версии (migrations.py).
+    На актуальной базе выполняется только чтение PRAGMA user_version"""
+    started = time.perf_counter()
+    async with pool.writer() as db:
+        previous, current = await migrations.migrate(db)
+    elapsed = time.perf_counter() - started
+    metrics.set_gauge("db_init_seconds", elapsed)
+    metrics.set_gauge("db_schema_version", current)
+    if previous != current:
+        logger.info("Схема базы обновлена с версии %d до %d за %.3f с", previous, current, elapsed)
+    else:
+        logger.info("Схема базы актуальна (версия %d), проверка заняла %.1f мс", current, elapsed * 1000)
+
+
+@metrics.timed_query
+async def backfill_minhash(batch_size: int = 500):
+    """Построение MinHash-подписей для одной порции заявок без подписи; возвращает ее размер"""
+    async with pool.writer() as db:
+        updated = await migrations.backfill_minhash(db, batch_size, max_batches=1)
         await db.commit()
-        
-        # Проверяем, есть ли уже тестовые данные
-        cursor = await db.execute("SELECT COUNT(*) FROM vacancies")
-        count = await cursor.fetchone()
-        
-        if count[0] == 0:
-            # Добавляем тестовые заявки
-            test_vacancies = [
-                (999001, "Senior Python Developer", 
-                 "Ищем опытного Python разработчика для работы над backend системами. "
-                 "Требования: Python 3.9+, FastAPI/Django, PostgreSQL, Docker.",
-                 "250,000 - 350,000 руб", "Москва (удаленно)", "@tech_company_hr", datetime.now().isoformat()),
-                
-                (999002, "Frontend React Developer",
-                 "Разработка современных веб-приложений на React. "
-                 "Требования: React 18+, TypeScript, Redux, опыт от 2 лет.",
-                 "180,000 - 280,000 руб", "Санкт-Петербург", "@spb_tech_hr", datetime.now().isoformat()),
-                
-                (999003, "DevOps Engineer",
-                 "Настройка и поддержка CI/CD, управление инфраструктурой. "
-                 "Требования: Kubernetes, AWS/GCP, Terraform, Ansible.",
-                 "200,000 - 300,000 руб", "Москва", "@devops_company", datetime.now().isoformat()),
-                
-                (999004, "Data Scientist",
-                 "Анализ данных, построение ML моделей. "
-                 "Требования: Python, pandas, scikit-learn, PyTorch/TensorFlow.",
-                 "220,000 - 320,000 руб", "Удаленно", "@data_team_lead", datetime.now().isoformat()),
-                
-                (999005, "QA Automation Engineer",
-                 "Автоматизация тестирования веб и мобильных приложений. "
-                 "Требования: Python/Java, Selenium, Pytest, опыт от 1 года.",
-                 "150,000 - 220,000 руб", "Казань", "@qa_manager", datetime.now().isoformat()),
-            ]
-            
-            await db.executemany("""
-                INSERT INTO vacancies (company_id, title, description, salary, location, contact, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, test_vacancies)
-            
-            await db.commit()
-            logger.info("Тестовые данные успешно добавлены")
+    return updated
 
 
+async def _write(operation):
+    """Выполнение записи operation(conn) через очередь групповой фиксации
+    или, если она не запущена, в отдельной транзакции; возвращает результат операции"""
+    if write_queue.running:
+        return await write_queue.submit(operation)
+    async with pool.writer() as db:
+        result = await operation(db)
+        await db.commit()
+    return result
+
+
+@metrics.timed_query
 async def save_user(user_id: int, username: str, user_type: str, 
                    company_name: str = None, contact: str = None):
     """Сохранение/обновление пользователя"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("""
+    record = UserRecord(user_id, username, user_type, company_name, contact, datetime.now().isoformat())
+    
+    async def operation(db):
+        cursor = await db.execute("""
             INSERT OR REPLACE INTO users (user_id, username, user_type, company_name, contact, created_at)
             VALUES (?, ?, ?, ?, ?, ?)
-        """, (user_id, username, user_type, company_name, contact, datetime.now().isoformat()))
-        await db.commit()
+        """, (record.user_id, record.username, record.user_type,
+              record.company_name, record.contact, record.created_at))
+        return cursor.lastrowid
+    
+    try:
+        await _write(operation)
+    except Exception:
+        user_cache.invalidate(user_id)
+        raise
+    user_cache.set(user_id, record)
 
 
+@metrics.timed_query
 async def get_user(user_id: int):
-    """Получение пользователя"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
+    """Получение пользователя (сначала из кэша)"""
+    record = user_cache.get(user_id)
+    if record is not None:
+        return record
+    
+    async with pool.reader() as db:
+        async with db.execute(
             "SELECT * FROM users WHERE user_id = ?", (user_id,)
-        )
-        return await cursor.fetchone()
+        ) as cursor:
+            row = await cursor.fetchone()
+    
+    if row is None:
+        return None
+    
+    record = UserRecord(*(row[key] for key in UserRecord.__slots__))
+    user_cache.set(user_id, record)
+    return record
+
 
+async def _find_duplicate(db, company_id: int, values: list, keys: list, structured: tuple):
+    """Ближайшая по MinHash заявка той же компании со сходством не ниже порога или None.
+    
+    Повтором считается только заявка с теми же городом, удаленкой и вилкой зарплаты
+    (structured - результат vacancy_fields): та же роль в другом городе - новая вакансия.
+    """
+    salary_min, salary_max, _, city, is_remote = structured
+    async with db.execute(f"""
+        WITH keys (band, bucket) AS (VALUES {", ".join("(?, ?)" for _ in keys)})
+        SELECT DISTINCT v.id, v.minhash
+        FROM keys k
+        JOIN vacancy_lsh l ON l.band = k.band AND l.bucket = k.bucket
+        JOIN vacancies v ON v.id = l.vacancy_id
+        WHERE v.company_id = ?
+          AND v.city IS ? AND v.is_remote = ?
+          AND v.salary_min IS ? AND v.salary_max IS ?
+    """, (*(value for key in keys for value in key), company_id,
+          city, is_remote, salary_min, salary_max)) as cursor:
+        candidates = await cursor.fetchall()
+    
+    best_id, best_score = None, dedup.DUPLICATE_THRESHOLD
+    for row in candidates:
+        score = dedup.similarity(values, dedup.from_blob(row['minhash']))
+        if score >= best_score:
+            best_id, best_score = row['id'], score
+    return best_id
 
+
+@metrics.timed_query
 async def create_vacancy(company_id: int, title: str, description: str, 
                         salary: str, location: str, contact: str):
-    """Создание заявки"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute("""
-            INSERT INTO vacancies (company_id, title, description, salary, location, contact, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (company_id, title, description, salary, location, contact, datetime.now().isoformat()))
-        await db.commit()
-        return cursor.lastrowid
+    """Создание заявки: (id, merged). Повтор своей же заявки (тот же город и зарплата,
+    текст с небольшими правками) не создает новую строку, а обновляет найденную (merged = True)"""
+    values = dedup.signature(title, description)
+    keys = dedup.band_keys(values)
+    now = datetime.now().isoformat()
+    structured = vacancy_fields(salary, location)
+    fields = (title, description, salary, location, contact, now,
+              *structured, dedup.to_blob(values))
+    
+    async def operation(db):
+        vacancy_id = await _find_duplicate(db, company_id, values, keys, structured)
+        merged = vacancy_id is not None
+        
+        if merged:
+            await db.execute("""
+                UPDATE vacancies
+                SET title = ?, description = ?, salary = ?, location = ?, contact = ?, created_at = ?,
+                    salary_min = ?, salary_max = ?, salary_currency = ?, city = ?, is_remote = ?,
+                    minhash = ?
+                WHERE id = ?
+            """, (*fields, vacancy_id))
+            await db.execute("DELETE FROM vacancy_lsh WHERE vacancy_id = ?", (vacancy_id,))
+        else:
+            cursor = await db.execute("""
+                INSERT INTO vacancies (title, description, salary, location, contact, created_at,
+                                       salary_min, salary_max, salary_currency, city, is_remote,
+                                       minhash, company_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (*fields, company_id))
+            vacancy_id = cursor.lastrowid
+            # Рассылка подписчикам ставится в очередь в той же транзакции
+            await db.execute(
+                "INSERT INTO notification_jobs (vacancy_id, created_at) VALUES (?, ?)", (vacancy_id, now)
+            )
+        
+        await db.executemany(
+            "INSERT INTO vacancy_lsh (band, bucket, vacancy_id) VALUES (?, ?, ?)",
+            [(band, bucket, vacancy_id) for band, bucket in keys]
+        )
+        # Счетчик уже увеличен триггером в той же транзакции
+        async with db.execute("SELECT value FROM counters WHERE name = 'vacancies'") as count_cursor:
+            count = await count_cursor.fetchone()
+        return vacancy_id, merged, count[0]
+    
+    vacancy_id, merged, count = await _write(operation)
+    _remember_vacancy_count(count)
+    if merged:
+        metrics.inc("vacancy_duplicates_total")
+    return vacancy_id, merged
 
 
-async def get_vacancies(limit: int = 10, offset: int = 0):
-    """Получение списка заявок с пагинацией"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("""
-            SELECT * FROM vacancies 
-            ORDER BY created_at DESC 
+def _filter_conditions(filters: dict = None, salary_index: bool = True):
+    """Условия WHERE по фильтрам рекрутера: min_salary, city, remote.
+    salary_index=False запрещает выбирать индекс зарплаты (унарный плюс)"""
+    conditions, params = [], []
+    if not filters:
+        return conditions, params
+    if filters.get('min_salary'):
+        conditions.append(f"{'' if salary_index else '+'}{SALARY_TOP} >= ?")
+        params.append(filters['min_salary'])
+    city = normalize_city(filters.get('city'))
+    if city:
+        conditions.append("city = ?")
+        params.append(city)
+    if filters.get('remote'):
+        conditions.append("is_remote = 1")
+    return conditions, params
+
+
+@metrics.timed_query
+async def count_vacancies(filters: dict = None):
+    """Количество заявок, подходящих под фильтры (кэшируется в памяти процесса)"""
+    conditions, params = _filter_conditions(filters)
+    if not conditions:
+        return await get_vacancies_count()
+    
+    cache_key = (" AND ".join(conditions), *params)
+    count = filtered_count_cache.get(cache_key)
+    if count is not None:
+        return count
+    
+    async with pool.reader() as db:
+        async with db.execute(
+            f"SELECT COUNT(*) FROM vacancies WHERE {' AND '.join(conditions)}", params
+        ) as cursor:
+            count = (await cursor.fetchone())[0]
+    
+    filtered_count_cache.set(cache_key, count)
+    return count
+
+
+@metrics.timed_query
+async def get_vacancies_page(limit: int = 10, offset: int = 0,
+                             after: tuple = None, before: tuple = None, filters: dict = None):
+    """Страница заявок вместе с общим количеством.
+    
+    after/before - ключ (created_at, id), от которого ищется соседняя страница по индексу;
+    без ключа используется OFFSET. filters - словарь фильтров (min_salary, city, remote).
+    Без фильтров общее количество приходит в том же запросе из таблицы счетчиков,
+    с фильтрами считается заранее (кэшируется) и определяет выбор индекса.
+    Возвращает (rows, total_count).
+    """
+    conditions, params = _filter_conditions(filters)
+    filtered = bool(conditions)
+    if filtered:
+        total_count = await count_vacancies(filters)
+        if not total_count:
+            return [], 0
+        if total_count > SALARY_INDEX_MAX_ROWS:
+            # По индексу зарплаты диапазон выбирается целиком и сортируется во временном
+            # B-дереве; при многих совпадениях первые строки быстрее найти по created_at
+            conditions, params = _filter_conditions(filters, salary_index=False)
+    if after is not None:
+        conditions.append("(created_at, id) < (?, ?)")
+        params.extend(after)
+        order = "DESC"
+    elif before is not None:
+        conditions.append("(created_at, id) > (?, ?)")
+        params.extend(before)
+        order = "ASC"
+    else:
+        order = "DESC"
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    total_column = "NULL" if filtered else "(SELECT value FROM counters WHERE name = 'vacancies')"
+    
+    async with pool.reader() as db:
+        async with db.execute(f"""
+            SELECT *, {total_column} AS total_count
+            FROM vacancies
+            {where}
+            ORDER BY created_at {order}, id {order}
             LIMIT ? OFFSET ?
-        """, (limit, offset))
-        return await cursor.fetchall()
+        """, (*params, limit, offset)) as cursor:
+            rows = await cursor.fetchall()
+    
+    if before is not None:
+        rows.reverse()
+    
+    if filtered:
+        return rows, total_count
+    if not rows:
+        return rows, await get_vacancies_count()
+    
+    _remember_vacancy_count(rows[0]['total_count'])
+    return rows, rows[0]['total_count']
+
+
+@metrics.timed_query
+async def get_vacancies(limit: int = 10, offset: int = 0):
+    """Получение списка заявок с пагинацией по смещению (для перехода на произвольную страницу)"""
+    rows, _ = await get_vacancies_page(limit=limit, offset=offset)
+    return rows
+
 
+@metrics.timed_query
+async def get_vacancies_after(key: tuple, limit: int = 10):
+    """Заявки, следующие за ключом (created_at, id) в порядке от новых к старым"""
+    rows, _ = await get_vacancies_page(limit=limit, after=key)
+    return rows
 
+
+@metrics.timed_query
+async def get_vacancies_before(key: tuple, limit: int = 10):
+    """Заявки, предшествующие ключу (created_at, id), в порядке от новых к старым"""
+    rows, _ = await get_vacancies_page(limit=limit, before=key)
+    return rows
+
+
+@metrics.timed_query
 async def get_vacancies_count():
-    """Получение общего количества заявок"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute("SELECT COUNT(*) FROM vacancies")
-        result = await cursor.fetchone()
-        return result[0]
+    """Получение общего количества заявок (из памяти процесса или таблицы счетчиков)"""
+    if _vacancy_count is not None and time.monotonic() < _vacancy_count_expires:
+        return _vacancy_count
+    
+    async with pool.reader() as db:
+        async with db.execute("SELECT value FROM counters WHERE name = 'vacancies'") as cursor:
+            result = await cursor.fetchone()
+    
+    _remember_vacancy_count(result[0])
+    return result[0]
+
+
+def _fts_query(text: str):
+    """Преобразование пользовательского запроса в выражение FTS5.
+    
+    Все слова обязательны; префиксный поиск только для последнего слова,
+    чтобы короткие префиксы не раздували выборку.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return ""
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+async def _search_ids(match: str):
+    """Id заявок (не больше SEARCH_RESULTS_LIMIT), из кэша или базы: до SEARCH_RANK_LIMIT
+    совпадений ранжируются BM25, при большем числе берутся самые новые"""
+    ids = search_cache.get(match)
+    if ids is not None:
+        return ids
+    
+    async with pool.reader() as db:
+        # FTS5 отдает совпадения в порядке rowid без сортировки и останавливается на LIMIT
+        async with db.execute("""
+            SELECT rowid FROM vacancies_fts
+            WHERE vacancies_fts MATCH ?
+            ORDER BY rowid DESC
+            LIMIT ?
+        """, (match, SEARCH_RANK_LIMIT + 1)) as cursor:
+            ids = [row[0] for row in await cursor.fetchall()]
+        
+        if len(ids) <= SEARCH_RANK_LIMIT:
+            # Веса BM25: совпадение в названии важнее, чем в локации и описании
+            async with db.execute("""
+                SELECT rowid FROM vacancies_fts
+                WHERE vacancies_fts MATCH ?
+                ORDER BY bm25(vacancies_fts, 10.0, 1.0, 5.0)
+                LIMIT ?
+            """, (match, SEARCH_RESULTS_LIMIT)) as cursor:
+                ids = [row[0] for row in await cursor.fetchall()]
+        else:
+            metrics.inc("search_unranked_total")
+            ids = ids[:SEARCH_RESULTS_LIMIT]
+    search_cache.set(match, ids)
+    return ids
+
+
+@metrics.timed_query
+async def search_vacancies(query: str, limit: int = 10, offset: int = 0):
+    """Полнотекстовый поиск заявок с ранжированием BM25 (по частым словам - по новизне).
+    Возвращает (rows, total_count); total_count ограничен SEARCH_RESULTS_LIMIT совпадениями"""
+    match = _fts_query(query)
+    if not match:
+        return [], 0
+    
+    ids = await _search_ids(match)
+    page_ids = ids[offset:offset + limit]
+    if not page_ids:
+        return [], len(ids)
+    
+    async with pool.reader() as db:
+        async with db.execute(
+            f"SELECT * FROM vacancies WHERE id IN ({', '.join('?' for _ in page_ids)})", page_ids
+        ) as cursor:
+            rows = {row['id']: row for row in await cursor.fetchall()}
+    # Заявки, удаленные после построения списка, пропускаются
+    return [rows[vacancy_id] for vacancy_id in page_ids if vacancy_id in rows], len(ids)
+
+
+MAX_SUBSCRIPTIONS = 20
+
+
+@metrics.timed_query
+async def add_subscription(user_id: int, kind: str, value: str):
+    """Добавление подписки; False, если такая уже есть или превышен лимит"""
+    async with pool.writer() as db:
+        async with db.execute(
+            "SELECT COUNT(*) FROM subscriptions WHERE user_id = ?", (user_id,)
+        ) as cursor:
+            count = (await cursor.fetchone())[0]
+        if count >= MAX_SUBSCRIPTIONS:
+            return False
+        cursor = await db.execute("""
+            INSERT OR IGNORE INTO subscriptions (user_id, kind, value, created_at)
+            VALUES (?, ?, ?, ?)
+        """, (user_id, kind, value, datetime.now().isoformat()))
+        await db.commit()
+    return cursor.rowcount > 0
+
+
+@metrics.timed_query
+async def get_subscriptions(user_id: int):
+    """Подписки пользователя"""
+    async with pool.reader() as db:
+        async with db.execute(
+            "SELECT * FROM subscriptions WHERE user_id = ? ORDER BY id", (user_id,)
+        ) as cursor:
+            return await cursor.fetchall()
+
+
+@metrics.timed_query
+async def delete_subscription(user_id: int, subscription_id: int):
+    """Удаление подписки пользователя"""
+    async with pool.writer() as db:
+        cursor = await db.execute(
+            "DELETE FROM subscriptions WHERE id = ? AND user_id = ?", (subscription_id, user_id)
+        )
+        await db.commit()
+    return cursor.rowcount > 0
+
+
+@metrics.timed_query
+async def delete_user_subscriptions(user_id: int):
+    """Удаление всех подписок пользователя и его неотправленных уведомлений"""
+    async with pool.writer() as db:
+        await db.execute("DELETE FROM subscriptions WHERE user_id = ?", (user_id,))
+        await db.execute("DELETE FROM notification_outbox WHERE chat_id = ?", (user_id,))
+        await db.commit()
+
+
+@metrics.timed_query
+async def get_subscriptions_since(last_id: int = 0):
+    """Подписки с id больше last_id (для построения и пополнения индекса matcher.py)"""
+    async with pool.reader() as db:
+        async with db.execute(
+            "SELECT id, user_id, kind, value FROM subscriptions WHERE id > ? ORDER BY id", (last_id,)
+        ) as cursor:
+            return await cursor.fetchall()
+
+
+@metrics.timed_query
+async def get_subscriptions_signature():
+    """(максимальный id, количество) подписок: меняется при добавлении и удалении"""
+    async with pool.reader() as db:
+        async with db.execute("SELECT MAX(id), COUNT(*) FROM subscriptions") as cursor:
+            row = await cursor.fetchone()
+    return row[0] or 0, row[1]
+
+
+@metrics.timed_query
+async def get_notification_jobs(limit: int = 100):
+    """Заявки, ожидающие рассылки (поля заявки NULL, если ее уже удалили)"""
+    async with pool.reader() as db:
+        async with db.execute("""
+            SELECT j.vacancy_id AS job_id, v.* FROM notification_jobs j
+            LEFT JOIN vacancies v ON v.id = j.vacancy_id
+            ORDER BY j.vacancy_id
+            LIMIT ?
+        """, (limit,)) as cursor:
+            return await cursor.fetchall()
+
+
+@metrics.timed_query
+async def enqueue_notifications(vacancy_id: int, chat_ids):
+    """Постановка уведомлений о заявке в очередь отправки и закрытие задания рассылки"""
+    async with pool.writer() as db:
+        await db.executemany(
+            "INSERT INTO notification_outbox (chat_id, vacancy_id) VALUES (?, ?)",
+            [(chat_id, vacancy_id) for chat_id in chat_ids]
+        )
+        await db.execute("DELETE FROM notification_jobs WHERE vacancy_id = ?", (vacancy_id,))
+        await db.commit()
+
+
+@metrics.timed_query
+async def get_due_notifications(now: float, limit: int = 100):
+    """Уведомления, которые пора отправить, вместе с заявкой (поля NULL, если ее удалили)"""
+    async with pool.reader() as db:
+        async with db.execute("""
+            SELECT o.id AS outbox_id, o.chat_id, o.attempts, v.*
+            FROM notification_outbox o
+            LEFT JOIN vacancies v ON v.id = o.vacancy_id
+            WHERE o.next_attempt_at <= ?
+            ORDER BY o.next_attempt_at, o.id
+            LIMIT ?
+        """, (now, limit)) as cursor:
+            return await cursor.fetchall()
+
+
+@metrics.timed_query
+async def count_pending_notifications():
+    """Размер очереди отправки"""
+    async with pool.reader() as db:
+        async with db.execute("SELECT COUNT(*) FROM notification_outbox") as cursor:
+            return (await cursor.fetchone())[0]
+
+
+@metrics.timed_query
+async def finish_notifications(sent_ids, retries):
+    """Удаление отправленных уведомлений и перенос остальных: retries - [(next_attempt_at, attempts, id)]"""
+    async with pool.writer() as db:
+        await db.executemany(
+            "DELETE FROM notification_outbox WHERE id = ?", [(outbox_id,) for outbox_id in sent_ids]
+        )
+        await db.executemany(
+            "UPDATE notification_outbox SET next_attempt_at = ?, attempts = ? WHERE id = ?", retries
+        )
+        await db.commit()
+
+
+@metrics.timed_query
+async def get_vacancy_contact(vacancy_id: int):
+    """Контакт заявки или None"""
+    async with pool.reader() as db:
+        async with db.execute("SELECT contact FROM vacancies WHERE id = ?", (vacancy_id,)) as cursor:
+            row = await cursor.fetchone()
+    return row['contact'] if row else None
+
+
+@metrics.timed_query
+async def add_vacancy_stats(deltas):
+    """Прибавление приращений просмотров и открытий контактов: deltas - [(vacancy_id, views, contacts)]"""
+    async with pool.writer() as db:
+        await db.executemany("""
+            INSERT INTO vacancy_stats (vacancy_id, views, contacts)
+            SELECT ?1, ?2, ?3 WHERE EXISTS (SELECT 1 FROM vacancies WHERE id = ?1)
+            ON CONFLICT (vacancy_id) DO UPDATE
+            SET views = views + excluded.views, contacts = contacts + excluded.contacts
+        """, deltas)
+        await db.commit()
+
+
+@metrics.timed_query
+async def get_most_viewed(limit: int = 10):
+    """Самые просматриваемые заявки по накопленной статистике"""
+    async with pool.reader() as db:
+        async with db.execute("""
+            SELECT v.id, v.title, v.salary, v.location, s.views, s.contacts
+            FROM vacancy_stats s
+            JOIN vacancies v ON v.id = s.vacancy_id
+            ORDER BY s.views DESC
+            LIMIT ?
+        """, (limit,)) as cursor:
+            return await cursor.fetchall()
+
+
+# Колонки, переносимые из vacancies в vacancies_archive
+ARCHIVE_COLUMNS = (
+    "id, company_id, title, description, salary, location, contact, created_at, "
+    "salary_min, salary_max, salary_currency, city, is_remote, version"
+)
+
+
+async def _move_to_archive(db, ids: list):
+    """Перенос заявок в архив внутри текущей транзакции"""
+    placeholders = ", ".join("?" for _ in ids)
+    await db.execute(f"""
+        INSERT OR REPLACE INTO vacancies_archive ({ARCHIVE_COLUMNS}, views, contacts, archived_at)
+        SELECT {", ".join("v." + column for column in ARCHIVE_COLUMNS.split(", "))},
+               COALESCE(s.views, 0), COALESCE(s.contacts, 0), ?
+        FROM vacancies v
+        LEFT JOIN vacancy_stats s ON s.vacancy_id = v.id
+        WHERE v.id IN ({placeholders})
+    """, (datetime.now().isoformat(), *ids))
+    # Счетчик, FTS, LSH-бакеты и статистика очищаются триггерами удаления
+    await db.execute(f"DELETE FROM vacancies WHERE id IN ({placeholders})", ids)
+
+
+async def _after_bulk_delete(db):
+    """Фиксация транзакции массового удаления и сброс закэшированных количеств и поисковых выдач"""
+    async with db.execute("SELECT value FROM counters WHERE name = 'vacancies'") as cursor:
+        count = await cursor.fetchone()
+    await db.commit()
+    _remember_vacancy_count(count[0])
+    filtered_count_cache.clear()
+    search_cache.clear()
+
+
+@metrics.timed_query
+async def archive_vacancies(cutoff: str, limit: int = 500):
+    """Перенос до limit заявок старше cutoff в архив одной транзакцией; возвращает их количество"""
+    async with pool.writer() as db:
+        async with db.execute(
+            "SELECT id FROM vacancies WHERE created_at < ? ORDER BY created_at, id LIMIT ?",
+            (cutoff, limit)
+        ) as cursor:
+            ids = [row['id'] for row in await cursor.fetchall()]
+        if not ids:
+            return 0
+        
+        await _move_to_archive(db, ids)
+        await _after_bulk_delete(db)
+    return len(ids)
+
+
+@metrics.timed_query
+async def count_expired_vacancies(cutoff: str):
+    """Количество заявок старше cutoff, еще не перенесенных в архив"""
+    async with pool.reader() as db:
+        async with db.execute("SELECT COUNT(*) FROM vacancies WHERE created_at < ?", (cutoff,)) as cursor:
+            return (await cursor.fetchone())[0]
+
+
+async def _pragma_value(db, sql: str):
+    async with db.execute(sql) as cursor:
+        row = await cursor.fetchone()
+    return row[0] if row else None
+
+
+@metrics.timed_query
+async def get_storage_stats():
+    """Режим auto_vacuum, размер базы и свободные страницы"""
+    async with pool.reader() as db:
+        return {
+            "auto_vacuum": await _pragma_value(db, "PRAGMA auto_vacuum"),
+            "page_count": await _pragma_value(db, "PRAGMA page_count"),
+            "freelist_count": await _pragma_value(db, "PRAGMA freelist_count"),
+        }
+
+
+@metrics.timed_query
+async def vacuum(incremental_pages: int = None):
+    """Освобождение свободных страниц: incremental_vacuum порцией страниц
+    или полный VACUUM (нужен один раз, чтобы включить auto_vacuum = INCREMENTAL)"""
+    async with pool.writer() as db:
+        if incremental_pages is None:
+            await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            await db.execute("VACUUM")
+        else:
+            # executescript выполняет PRAGMA до конца: через execute модуль sqlite3
+            # делает один шаг, и освобождается только одна страница
+            await db.executescript(f"PRAGMA incremental_vacuum({int(incremental_pages)})")
+
+
+@metrics.timed_query
+async def analyze(analysis_limit: int = 1000):
+    """Обновление статистики планировщика по выборке строк (analysis_limit)"""
+    async with pool.writer() as db:
+        async with db.execute(f"PRAGMA analysis_limit = {int(analysis_limit)}") as cursor:
+            await cursor.fetchall()
+        await db.execute("ANALYZE")
+        await db.commit()
+
+
+@metrics.timed_query
+async def get_company_vacancies_page(company_id: int, limit: int = 5,
+                                     cursor: tuple = None, direction: str = None):
+    """Страница заявок компании (новые сначала) со статистикой и общим количеством.
+    
+    cursor - ключ (created_at, id); direction: "n" - более старые, чем ключ,
+    "p" - более новые, "=" - начиная с самого ключа. Возвращает (rows, total_count).
+    """
+    conditions, params = ["v.company_id = ?"], [company_id]
+    order = "DESC"
+    if cursor is not None:
+        operator = {"n": "<", "p": ">", "=": "<="}[direction]
+        conditions.append(f"(v.created_at, v.id) {operator} (?, ?)")
+        params.extend(cursor)
+        if direction == "p":
+            order = "ASC"
+    
+    async with pool.reader() as db:
+        async with db.execute(f"""
+            SELECT v.id, v.title, v.salary, v.location, v.created_at,
+                   COALESCE(s.views, 0) AS views, COALESCE(s.contacts, 0) AS contacts
+            FROM vacancies v
+            LEFT JOIN vacancy_stats s ON s.vacancy_id = v.id
+            WHERE {" AND ".join(conditions)}
+            ORDER BY v.created_at {order}, v.id {order}
+            LIMIT ?
+        """, (*params, limit)) as db_cursor:
+            rows = await db_cursor.fetchall()
+        async with db.execute(
+            "SELECT COUNT(*) FROM vacancies WHERE company_id = ?", (company_id,)
+        ) as db_cursor:
+            total = (await db_cursor.fetchone())[0]
+    
+    if order == "ASC":
+        rows.reverse()
+    return rows, total
+
+
+@metrics.timed_query
+async def close_company_vacancies(company_id: int, ids: list):
+    """Снятие заявок компании с публикации (перенос в архив) одной транзакцией"""
+    if not ids:
+        return 0
+    async with pool.writer() as db:
+        async with db.execute(
+            f"SELECT id FROM vacancies WHERE company_id = ? AND id IN ({', '.join('?' for _ in ids)})",
+            (company_id, *ids)
+        ) as cursor:
+            own_ids = [row['id'] for row in await cursor.fetchall()]
+        if own_ids:
+            await _move_to_archive(db, own_ids)
+        await _after_bulk_delete(db)
+    return len(own_ids)
+
+
+@metrics.timed_query
+async def delete_company_vacancies(company_id: int, ids: list):
+    """Удаление заявок компании одной транзакцией"""
+    if not ids:
+        return 0
+    async with pool.writer() as db:
+        cursor = await db.execute(
+            f"DELETE FROM vacancies WHERE company_id = ? AND id IN ({', '.join('?' for _ in ids)})",
+            (company_id, *ids)
+        )
+        await _after_bulk_delete(db)
+    return cursor.rowcount
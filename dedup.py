@@ -0,0 +1,66 @@
+import hashlib
+import random
+from array import array
+
+from matcher import tokenize
+
+# MinHash: NUM_PERM хеш-функций, LSH: BANDS полос по ROWS значений.
+# Порог попадания в один бакет хотя бы по одной полосе ~ (1 / BANDS) ** (1 / ROWS) = 0.77
+NUM_PERM = 64
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+
+# Оценка сходства Жаккара, начиная с которой заявка считается повтором
+DUPLICATE_THRESHOLD = 0.8
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Коэффициенты перестановок фиксированы: подписи в базе должны оставаться сравнимыми
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "little")
+
+
+def shingles(text: str, size: int = 2) -> set:
+    """Множество пар соседних слов текста (для очень коротких текстов - отдельные слова)"""
+    words = tokenize(text)
+    if len(words) < size:
+        return set(words)
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def signature(title: str, description: str) -> list:
+    """MinHash-подпись заявки по названию и описанию"""
+    hashes = [_hash(shingle) for shingle in shingles(f"{title} {description}")]
+    if not hashes:
+        return [_MAX_HASH] * NUM_PERM
+    return [min((a * h + b) % _PRIME for h in hashes) & _MAX_HASH for a, b in _PERMUTATIONS]
+
+
+def to_blob(values: list) -> bytes:
+    return array("I", values).tobytes()
+
+
+def from_blob(blob: bytes) -> list:
+    values = array("I")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+def band_keys(values: list):
+    """Ключи LSH-бакетов подписи: [(номер полосы, хеш полосы)]"""
+    keys = []
+    for band in range(BANDS):
+        chunk = array("I", values[band * ROWS:(band + 1) * ROWS]).tobytes()
+        bucket = int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "little", signed=True)
+        keys.append((band, bucket))
+    return keys
+
+
+def similarity(first: list, second: list) -> float:
+    """Оценка сходства Жаккара по двум подписям"""
+    return sum(1 for x, y in zip(first, second) if x == y) / NUM_PERM
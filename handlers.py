@@ -1,16 +1,26 @@
 import logging
 from aiogram import Router, F
-from aiogram.filters import CommandStart
-from aiogram.types import Message, CallbackQuery
+from aiogram.filters import Command, CommandObject, CommandStart
+from aiogram.types import (
+    CallbackQuery, ErrorEvent, InlineQuery, InlineQueryResultArticle, InputTextMessageContent, Message
+)
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
+import analytics
+import browse_cache
 import database as db
 import keyboards as kb
+import notifier
+from matcher import normalize_keyword
+from normalize import normalize_location, parse_salary
+from throttling import PaginationMiddleware, edit_if_changed, remember_rendered
 
 logger = logging.getLogger(__name__)
 
 router = Router()
+pagination_middleware = PaginationMiddleware(prefixes=("page_", "spage_", "mypage_"))
+router.callback_query.middleware(pagination_middleware)
 
 
 # FSM состояния для публикации вакансии
@@ -23,6 +33,13 @@ class VacancyForm(StatesGroup):
     waiting_for_location = State()
 
 
+# FSM состояния для настройки фильтров просмотра вакансий
+class FilterForm(StatesGroup):
+    waiting_for_min_salary = State()
+    waiting_for_city = State()
+    waiting_for_remote = State()
+
+
 @router.message(CommandStart())
 async def cmd_start(message: Message, state: FSMContext):
     """Обработчик команды /start"""
@@ -49,7 +66,7 @@ async def cmd_start(message: Message, state: FSMContext):
             reply_markup=kb.get_start_keyboard()
         )
     
-    logger.info(f"Пользователь {message.from_user.id} (@{message.from_user.username}) начал работу с ботом")
+    logger.info("Пользователь %s (@%s) начал работу с ботом", message.from_user.id, message.from_user.username)
 
 
 @router.message(F.text == "👔 Я компания (нанимаю)")
@@ -60,7 +77,7 @@ async def register_company(message: Message, state: FSMContext):
         reply_markup=kb.get_cancel_keyboard()
     )
     await state.set_state(VacancyForm.waiting_for_company_name)
-    logger.info(f"Пользователь {message.from_user.id} начал регистрацию как компания")
+    logger.info("Пользователь %s начал регистрацию как компания", message.from_user.id)
 
 
 @router.message(VacancyForm.waiting_for_company_name)
@@ -106,7 +123,7 @@ async def process_company_contact(message: Message, state: FSMContext):
         "Теперь вы можете публиковать вакансии.",
         reply_markup=kb.get_company_menu()
     )
-    logger.info(f"Компания {company_name} (ID: {message.from_user.id}) зарегистрирована")
+    logger.info("Компания %s (ID: %s) зарегистрирована", company_name, message.from_user.id)
 
 
 @router.message(F.text == "🔍 Я рекрутер (ищу вакансии)")
@@ -123,7 +140,7 @@ async def register_recruiter(message: Message):
         "Теперь вы можете просматривать вакансии.",
         reply_markup=kb.get_recruiter_menu()
     )
-    logger.info(f"Рекрутер {message.from_user.id} (@{message.from_user.username}) зарегистрирован")
+    logger.info("Рекрутер %s (@%s) зарегистрирован", message.from_user.id, message.from_user.username)
 
 
 @router.message(F.text == "🔙 Главное меню")
@@ -209,7 +226,7 @@ async def process_location(message: Message, state: FSMContext):
     data = await state.get_data()
     user = await db.get_user(message.from_user.id)
     
-    vacancy_id = await db.create_vacancy(
+    vacancy_id, merged = await db.create_vacancy(
         company_id=message.from_user.id,
         title=data['title'],
         description=data['description'],
@@ -219,6 +236,22 @@ async def process_location(message: Message, state: FSMContext):
     )
     
     await state.clear()
+    
+    if merged:
+        # Почти совпадает с уже опубликованной заявкой компании: она обновлена и поднята наверх
+        await message.answer(
+            "♻️ Похожая вакансия уже опубликована - мы обновили ее вместо создания копии.\n\n"
+            f"📌 {data['title']}\n"
+            f"💰 {data['salary']}\n"
+            f"📍 {message.text}",
+            reply_markup=kb.get_company_menu()
+        )
+        logger.info("Вакансия ID %s компании %s обновлена повторной публикацией",
+                    vacancy_id, user['company_name'])
+        return
+    
+    notifier.wake()
+    
     await message.answer(
         f"✅ Вакансия успешно опубликована!\n\n"
         f"📌 {data['title']}\n"
@@ -228,11 +261,11 @@ async def process_location(message: Message, state: FSMContext):
         f"📞 Контакт: {user['contact']}",
         reply_markup=kb.get_company_menu()
     )
-    logger.info(f"Вакансия ID {vacancy_id} создана компанией {user['company_name']}")
+    logger.info("Вакансия ID %s создана компанией %s", vacancy_id, user['company_name'])
 
 
 @router.message(F.text == "📝 Смотреть вакансии")
-async def view_vacancies(message: Message):
+async def view_vacancies(message: Message, state: FSMContext):
     """Просмотр вакансий"""
     user = await db.get_user(message.from_user.id)
     
@@ -240,80 +273,481 @@ async def view_vacancies(message: Message):
         await message.answer("Только рекрутеры могут просматривать вакансии!")
         return
     
-    await show_vacancies_page(message, 0)
+    data = await state.get_data()
+    await show_vacancies_page(message, 0, data.get('filters'))
 
 
-async def show_vacancies_page(message: Message, page: int):
-    """Отображение страницы с вакансиями"""
+def _describe_filters(filters: dict):
+    """Текстовое описание фильтров"""
+    parts = []
+    if filters.get('min_salary'):
+        parts.append(f"зарплата от {filters['min_salary']:,}".replace(",", " "))
+    if filters.get('city'):
+        parts.append(f"город: {filters['city']}")
+    if filters.get('remote'):
+        parts.append("только удаленно")
+    return ", ".join(parts) if parts else "без фильтров"
+
+
+@router.message(F.text == "⚙️ Фильтры")
+async def set_filters(message: Message, state: FSMContext):
+    """Начало настройки фильтров просмотра вакансий"""
+    user = await db.get_user(message.from_user.id)
+    
+    if not user or user['user_type'] != 'recruiter':
+        await message.answer("Только рекрутеры могут просматривать вакансии!")
+        return
+    
+    await message.answer(
+        "Введите минимальную зарплату (например: 200000) или нажмите «Пропустить»:",
+        reply_markup=kb.get_skip_keyboard()
+    )
+    await state.set_state(FilterForm.waiting_for_min_salary)
+
+
+async def _cancel_filters(message: Message, state: FSMContext):
+    """Отмена настройки фильтров с сохранением прежних"""
+    await state.set_state(None)
+    await message.answer("Настройка фильтров отменена.", reply_markup=kb.get_recruiter_menu())
+
+
+@router.message(FilterForm.waiting_for_min_salary)
+async def process_filter_salary(message: Message, state: FSMContext):
+    """Обработка минимальной зарплаты"""
+    if message.text == "❌ Отмена":
+        await _cancel_filters(message, state)
+        return
+    
+    min_salary = None
+    if message.text != "⏭ Пропустить":
+        low, high, _ = parse_salary(message.text)
+        min_salary = low or high
+        if not min_salary:
+            await message.answer("Не удалось распознать сумму. Введите число, например: 200000")
+            return
+    
+    await state.update_data(filter_min_salary=min_salary)
+    await message.answer(
+        "Введите город или нажмите «Пропустить»:",
+        reply_markup=kb.get_skip_keyboard()
+    )
+    await state.set_state(FilterForm.waiting_for_city)
+
+
+@router.message(FilterForm.waiting_for_city)
+async def process_filter_city(message: Message, state: FSMContext):
+    """Обработка города"""
+    if message.text == "❌ Отмена":
+        await _cancel_filters(message, state)
+        return
+    
+    city = None if message.text == "⏭ Пропустить" else message.text.strip()
+    await state.update_data(filter_city=city)
+    await message.answer("Формат работы:", reply_markup=kb.get_remote_keyboard())
+    await state.set_state(FilterForm.waiting_for_remote)
+
+
+@router.message(FilterForm.waiting_for_remote)
+async def process_filter_remote(message: Message, state: FSMContext):
+    """Обработка формата работы и сохранение фильтров"""
+    if message.text == "❌ Отмена":
+        await _cancel_filters(message, state)
+        return
+    
+    data = await state.get_data()
+    filters = {
+        'min_salary': data.get('filter_min_salary'),
+        'city': data.get('filter_city'),
+        'remote': message.text == "🏠 Только удаленно",
+    }
+    
+    # Фильтры остаются в данных FSM и применяются при листании
+    await state.set_state(None)
+    await state.update_data(filters=filters)
+    await message.answer(
+        f"Фильтры сохранены: {_describe_filters(filters)} ✅",
+        reply_markup=kb.get_recruiter_menu()
+    )
+    logger.info("Рекрутер %s установил фильтры: %s", message.from_user.id, filters)
+    
+    await show_vacancies_page(message, 0, filters)
+
+
+def _parse_page_callback(data: str):
+    """Разбор callback data пагинации: номер страницы, направление и ключ вакансии"""
+    parts = data.split("_", 4)
+    page = int(parts[1])
+    if len(parts) < 5:
+        # Старый формат page_N без ключа
+        return page, None, None
+    direction, created_at, vacancy_id = parts[2], parts[3], int(parts[4])
+    return page, direction, (created_at, vacancy_id)
+
+
+async def _load_vacancy_page(page: int, direction: str = None, cursor: tuple = None,
+                             filters: dict = None, chat_id: int = None):
+    """Загрузка вакансии для страницы вместе с общим количеством.
+    
+    Сначала проверяется окно предзагрузки чата; при промахе соседние страницы
+    ищутся по индексу от ключа показанной вакансии (с запасом вперед по направлению
+    листания), произвольный переход на страницу выполняется через OFFSET.
+    """
     per_page = 1  # Одна вакансия на страницу для удобства
-    total_count = await db.get_vacancies_count()
+    window_size = per_page + browse_cache.PREFETCH_AHEAD
+    
+    vacancy = browse_cache.get_cached_page(chat_id, page, direction, cursor, filters)
+    if vacancy is not None:
+        total_count = await db.count_vacancies(filters)
+        total_pages = (total_count + per_page - 1) // per_page
+        if 0 <= page < total_pages:
+            return vacancy, page, total_count, total_pages
+    
+    start_page = page
+    if cursor is not None and page >= 0:
+        if direction == "n":
+            vacancies, total_count = await db.get_vacancies_page(
+                limit=window_size, after=cursor, filters=filters
+            )
+        else:
+            vacancies, total_count = await db.get_vacancies_page(
+                limit=window_size, before=cursor, filters=filters
+            )
+            # Ближайшая к ключу вакансия - последняя в окне
+            start_page = page - len(vacancies) + 1
+    else:
+        vacancies, total_count = await db.get_vacancies_page(
+            limit=window_size, offset=max(page, 0) * per_page, filters=filters
+        )
     
     if total_count == 0:
-        await message.answer("Пока нет доступных вакансий. 🤷", reply_markup=kb.get_recruiter_menu())
-        return
+        return None, 0, 0, 0
     
     total_pages = (total_count + per_page - 1) // per_page
     
     if page < 0:
         page = 0
-    if page >= total_pages:
-        page = total_pages - 1
-    
-    vacancies = await db.get_vacancies(limit=per_page, offset=page * per_page)
+    if page >= total_pages or not vacancies or start_page < 0:
+        # Страница вне диапазона или вакансия-ключ исчезла: переход по номеру страницы
+        page = min(page, total_pages - 1)
+        start_page = page
+        vacancies, total_count = await db.get_vacancies_page(
+            limit=window_size, offset=page * per_page, filters=filters
+        )
     
     if not vacancies:
-        await message.answer("Вакансии не найдены.", reply_markup=kb.get_recruiter_menu())
-        return
+        return None, page, total_count, total_pages
     
-    vacancy = vacancies[0]
-    text = (
-        f"📌 <b>{vacancy['title']}</b>\n\n"
-        f"💰 Зарплата: {vacancy['salary']}\n"
-        f"📍 Локация: {vacancy['location']}\n\n"
-        f"📝 Описание:\n{vacancy['description']}\n\n"
-        f"📞 Контакт: {vacancy['contact']}\n\n"
-        f"Вакансия {page + 1} из {total_count}"
+    browse_cache.store_window(chat_id, start_page, vacancies, filters)
+    return vacancies[page - start_page], page, total_count, total_pages
+
+
+def _format_vacancy(vacancy, page: int, total_count: int):
+    """Текст карточки вакансии (контакт открывается кнопкой)"""
+    return f"{browse_cache.render_card(vacancy, show_contact=False)}\n\nВакансия {page + 1} из {total_count}"
+
+
+async def show_vacancies_page(message: Message, page: int, filters: dict = None):
+    """Отображение страницы с вакансиями"""
+    vacancy, page, total_count, total_pages = await _load_vacancy_page(
+        page, filters=filters, chat_id=message.chat.id
     )
     
-    await message.answer(
-        text,
-        parse_mode="HTML",
-        reply_markup=kb.get_pagination_keyboard(page, total_pages)
+    if total_count == 0:
+        if filters:
+            await message.answer(
+                "Нет вакансий, подходящих под фильтры. 🤷\n"
+                "Измените их через «⚙️ Фильтры».",
+                reply_markup=kb.get_recruiter_menu()
+            )
+        else:
+            await message.answer("Пока нет доступных вакансий. 🤷", reply_markup=kb.get_recruiter_menu())
+        return
+    
+    if vacancy is None:
+        await message.answer("Вакансии не найдены.", reply_markup=kb.get_recruiter_menu())
+        return
+    
+    text = _format_vacancy(vacancy, page, total_count)
+    markup = kb.get_pagination_keyboard(
+        page, total_pages, cursor=(vacancy['created_at'], vacancy['id']), vacancy_id=vacancy['id']
     )
+    sent = await message.answer(text, parse_mode="HTML", reply_markup=markup)
+    remember_rendered(sent, text, markup)
+    analytics.record_view(vacancy['id'])
 
 
 @router.callback_query(F.data.startswith("page_"))
-async def paginate_vacancies(callback: CallbackQuery):
+async def paginate_vacancies(callback: CallbackQuery, state: FSMContext):
     """Обработка пагинации вакансий"""
-    page = int(callback.data.split("_")[1])
+    data = await state.get_data()
+    page, direction, cursor = _parse_page_callback(callback.data)
+    vacancy, page, total_count, total_pages = await _load_vacancy_page(
+        page, direction, cursor, data.get('filters'), callback.message.chat.id
+    )
     
-    per_page = 1
-    total_count = await db.get_vacancies_count()
-    total_pages = (total_count + per_page - 1) // per_page
+    if vacancy is None:
+        await callback.answer("Вакансии не найдены.")
+        return
     
-    if page < 0:
+    if await edit_if_changed(
+        callback.message,
+        _format_vacancy(vacancy, page, total_count),
+        parse_mode="HTML",
+        reply_markup=kb.get_pagination_keyboard(
+            page, total_pages, cursor=(vacancy['created_at'], vacancy['id']), vacancy_id=vacancy['id']
+        )
+    ):
+        analytics.record_view(vacancy['id'])
+    await callback.answer()
+
+
+async def _load_search_page(query: str, page: int):
+    """Загрузка страницы результатов поиска: (vacancy, page, total_count)"""
+    page = max(page, 0)
+    vacancies, total_count = await db.search_vacancies(query, limit=1, offset=page)
+    
+    if not vacancies and page > 0:
+        # Выдача изменилась и страница вышла за пределы - возвращаемся к началу
         page = 0
-    if page >= total_pages:
-        page = total_pages - 1
+        vacancies, total_count = await db.search_vacancies(query, limit=1, offset=0)
     
-    vacancies = await db.get_vacancies(limit=per_page, offset=page * per_page)
-    vacancy = vacancies[0]
+    if not vacancies:
+        return None, page, 0
+    return vacancies[0], page, total_count
+
+
+@router.message(Command("search"))
+async def cmd_search(message: Message, command: CommandObject, state: FSMContext):
+    """Полнотекстовый поиск вакансий: /search <запрос>"""
+    user = await db.get_user(message.from_user.id)
     
-    text = (
-        f"📌 <b>{vacancy['title']}</b>\n\n"
-        f"💰 Зарплата: {vacancy['salary']}\n"
-        f"📍 Локация: {vacancy['location']}\n\n"
-        f"📝 Описание:\n{vacancy['description']}\n\n"
-        f"📞 Контакт: {vacancy['contact']}\n\n"
-        f"Вакансия {page + 1} из {total_count}"
+    if not user or user['user_type'] != 'recruiter':
+        await message.answer("Только рекрутеры могут искать вакансии!")
+        return
+    
+    query = (command.args or "").strip()
+    if not query:
+        await message.answer("Укажите запрос, например: /search python москва")
+        return
+    
+    vacancy, page, total_count = await _load_search_page(query, 0)
+    logger.info("Рекрутер %s ищет \"%s\", найдено: %s", message.from_user.id, query, total_count)
+    
+    if vacancy is None:
+        await message.answer("По вашему запросу ничего не найдено. 🤷", reply_markup=kb.get_recruiter_menu())
+        return
+    
+    # Запрос не помещается в callback data, поэтому хранится в данных FSM
+    await state.update_data(search_query=query)
+    text = _format_vacancy(vacancy, page, total_count)
+    markup = kb.get_pagination_keyboard(page, total_count, prefix="spage", vacancy_id=vacancy['id'])
+    sent = await message.answer(text, parse_mode="HTML", reply_markup=markup)
+    remember_rendered(sent, text, markup)
+    analytics.record_view(vacancy['id'])
+
+
+@router.callback_query(F.data.startswith("spage_"))
+async def paginate_search(callback: CallbackQuery, state: FSMContext):
+    """Пагинация результатов поиска"""
+    data = await state.get_data()
+    query = data.get('search_query')
+    
+    if not query:
+        await callback.answer("Результаты поиска устарели, повторите /search", show_alert=True)
+        return
+    
+    page = int(callback.data.split("_")[1])
+    vacancy, page, total_count = await _load_search_page(query, page)
+    
+    if vacancy is None:
+        await callback.answer("Вакансии не найдены.")
+        return
+    
+    if await edit_if_changed(
+        callback.message,
+        _format_vacancy(vacancy, page, total_count),
+        parse_mode="HTML",
+        reply_markup=kb.get_pagination_keyboard(page, total_count, prefix="spage", vacancy_id=vacancy['id'])
+    ):
+        analytics.record_view(vacancy['id'])
+    await callback.answer()
+
+
+async def _load_inline_page(query: str, offset: int):
+    """Выдача inline-поиска: сначала из кэша процесса, иначе из базы.
+    Пустой запрос показывает свежие вакансии"""
+    page = browse_cache.get_inline_page(query, offset)
+    if page is not None:
+        return page
+    
+    if query:
+        rows, total_count = await db.search_vacancies(query, limit=browse_cache.INLINE_PAGE_SIZE, offset=offset)
+    else:
+        rows, total_count = await db.get_vacancies_page(limit=browse_cache.INLINE_PAGE_SIZE, offset=offset)
+    browse_cache.store_inline_page(query, offset, rows, total_count)
+    return rows, total_count
+
+
+@router.inline_query()
+async def inline_search(inline_query: InlineQuery):
+    """Inline-поиск вакансий: @bot python москва"""
+    query = browse_cache.normalize_query(inline_query.query)
+    offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+    rows, total_count = await _load_inline_page(query, offset)
+    
+    results = [
+        InlineQueryResultArticle(
+            id=str(vacancy['id']),
+            title=vacancy['title'],
+            description=f"💰 {vacancy['salary']}  📍 {vacancy['location']}",
+            input_message_content=InputTextMessageContent(
+                message_text=browse_cache.render_card(vacancy, show_contact=False),
+                parse_mode="HTML",
+            ),
+            reply_markup=kb.get_contact_keyboard(vacancy['id']),
+        )
+        for vacancy in rows
+    ]
+    next_offset = offset + len(rows)
+    # Выдача одинакова для всех пользователей: Telegram может отдавать ее из своего кэша
+    await inline_query.answer(
+        results,
+        cache_time=browse_cache.INLINE_CACHE_TTL,
+        is_personal=False,
+        next_offset=str(next_offset) if rows and next_offset < total_count else "",
     )
+
+
+@router.callback_query(F.data.startswith("contact_"))
+async def reveal_contact(callback: CallbackQuery):
+    """Открытие контакта вакансии"""
+    vacancy_id = int(callback.data.split("_")[1])
+    contact = await db.get_vacancy_contact(vacancy_id)
+    
+    if contact is None:
+        await callback.answer("Вакансия больше не доступна.", show_alert=True)
+        return
+    
+    analytics.record_contact(vacancy_id)
+    await callback.answer(f"📞 Контакт: {contact}", show_alert=True)
+
+
+@router.message(F.text == "🔥 Популярные")
+async def most_viewed(message: Message):
+    """Самые просматриваемые вакансии"""
+    user = await db.get_user(message.from_user.id)
+    
+    if not user or user['user_type'] != 'recruiter':
+        await message.answer("Только рекрутеры могут просматривать вакансии!")
+        return
+    
+    vacancies = await db.get_most_viewed(10)
+    if not vacancies:
+        await message.answer("Статистика просмотров пока не собрана. 🤷", reply_markup=kb.get_recruiter_menu())
+        return
     
-    await callback.message.edit_text(
-        text,
+    lines = [
+        f"{position}. <b>{vacancy['title']}</b> - {vacancy['salary']}, {vacancy['location']}\n"
+        f"    👁 {vacancy['views']}  📞 {vacancy['contacts']}"
+        for position, vacancy in enumerate(vacancies, 1)
+    ]
+    await message.answer(
+        "🔥 Самые просматриваемые вакансии:\n\n" + "\n".join(lines),
         parse_mode="HTML",
-        reply_markup=kb.get_pagination_keyboard(page, total_pages)
+        reply_markup=kb.get_recruiter_menu()
     )
-    await callback.answer()
+
+
+def _describe_subscription(subscription):
+    """Подпись подписки для списка"""
+    if subscription['kind'] == 'city':
+        return f"город: {subscription['value'].title()}"
+    if subscription['kind'] == 'remote':
+        return "удаленная работа"
+    if subscription['kind'] == 'salary':
+        return f"зарплата от {int(subscription['value']):,}".replace(",", " ")
+    return f"«{subscription['value']}»"
+
+
+async def _send_subscriptions(message: Message, user_id: int):
+    """Список подписок пользователя с кнопками удаления"""
+    subscriptions = await db.get_subscriptions(user_id)
+    help_text = (
+        "Добавить подписку:\n"
+        "/subscribe python - по ключевому слову в названии или описании\n"
+        "/subscribe город Москва - по городу (или «город удаленно»)\n"
+        "/subscribe от 200000 - по зарплате"
+    )
+    if not subscriptions:
+        await message.answer(f"У вас пока нет подписок. 🔕\n\n{help_text}")
+        return
+    await message.answer(
+        f"🔔 Ваши подписки (нажмите, чтобы удалить):\n\n{help_text}",
+        reply_markup=kb.get_subscriptions_keyboard(
+            [(sub['id'], _describe_subscription(sub)) for sub in subscriptions]
+        )
+    )
+
+
+@router.message(F.text == "🔔 Подписки")
+async def show_subscriptions(message: Message):
+    """Список подписок на новые вакансии"""
+    user = await db.get_user(message.from_user.id)
+    
+    if not user or user['user_type'] != 'recruiter':
+        await message.answer("Только рекрутеры могут подписываться на вакансии!")
+        return
+    
+    await _send_subscriptions(message, message.from_user.id)
+
+
+@router.message(Command("subscribe"))
+async def cmd_subscribe(message: Message, command: CommandObject):
+    """Подписка на новые вакансии: /subscribe <слова>, /subscribe город <город>, /subscribe от <сумма>"""
+    user = await db.get_user(message.from_user.id)
+    
+    if not user or user['user_type'] != 'recruiter':
+        await message.answer("Только рекрутеры могут подписываться на вакансии!")
+        return
+    
+    args = (command.args or "").strip()
+    words = args.split(maxsplit=1)
+    if len(words) == 2 and words[0].lower() == "город":
+        city, is_remote = normalize_location(words[1])
+        if city:
+            kind, value = 'city', city
+        elif is_remote:
+            kind, value = 'remote', '1'
+        else:
+            kind, value = None, None
+    elif len(words) == 2 and words[0].lower() == "от":
+        min_salary = parse_salary(words[1])[0]
+        kind, value = 'salary', str(min_salary) if min_salary else None
+    else:
+        kind, value = 'keyword', normalize_keyword(args)
+    
+    if not value:
+        await message.answer("Укажите ключевое слово или город, например: /subscribe python")
+        return
+    
+    if not await db.add_subscription(message.from_user.id, kind, value):
+        await message.answer(
+            f"Такая подписка уже есть или достигнут лимит ({db.MAX_SUBSCRIPTIONS})."
+        )
+        return
+    
+    logger.info("Рекрутер %s подписался: %s=%s", message.from_user.id, kind, value)
+    await message.answer(f"✅ Подписка добавлена: {_describe_subscription({'kind': kind, 'value': value})}")
+
+
+@router.callback_query(F.data.startswith("unsub_"))
+async def unsubscribe(callback: CallbackQuery):
+    """Удаление подписки"""
+    subscription_id = int(callback.data.split("_")[1])
+    await db.delete_subscription(callback.from_user.id, subscription_id)
+    await callback.message.delete()
+    await _send_subscriptions(callback.message, callback.from_user.id)
+    await callback.answer("Подписка удалена")
 
 
 @router.callback_query(F.data == "current_page")
@@ -329,13 +763,147 @@ async def close_vacancies(callback: CallbackQuery):
     await callback.answer("Закрыто")
 
 
-@router.message(F.text == "📋 Мои вакансии")
-async def my_vacancies(message: Message):
-    """Просмотр собственных вакансий (заглушка)"""
-    await message.answer(
-        "Функция просмотра ваших вакансий будет добавлена в следующей версии.",
-        reply_markup=kb.get_company_menu()
+MY_PAGE_SIZE = 5
+
+
+async def _render_my_vacancies(company_id: int, view: dict, direction: str = "=", cursor: tuple = None):
+    """Текст и клавиатура страницы "Мои вакансии".
+    
+    view - состояние списка в FSM: номер страницы, ключ первой заявки страницы (anchor)
+    и отмеченные заявки. Без cursor страница перерисовывается от anchor; если заявок
+    на ней не осталось, показывается первая страница. Возвращает (text, markup) или None.
+    """
+    page = view.get('page', 0)
+    if cursor is None and view.get('anchor'):
+        cursor = tuple(view['anchor'])
+    vacancies, total_count = await db.get_company_vacancies_page(
+        company_id, MY_PAGE_SIZE, cursor, direction if cursor else None
     )
+    if not vacancies and total_count:
+        page = 0
+        vacancies, total_count = await db.get_company_vacancies_page(company_id, MY_PAGE_SIZE)
+    if not vacancies:
+        return None
+    
+    total_pages = (total_count + MY_PAGE_SIZE - 1) // MY_PAGE_SIZE
+    page = min(page, total_pages - 1)
+    view['page'] = page
+    view['anchor'] = [vacancies[0]['created_at'], vacancies[0]['id']]
+    selected = set(view.setdefault('selected', []))
+    
+    lines = [
+        f"{position}. <b>{vacancy['title']}</b> - {vacancy['salary']}, {vacancy['location']}\n"
+        f"    👁 {vacancy['views']}  📞 {vacancy['contacts']}  📅 {vacancy['created_at'][:10]}"
+        for position, vacancy in enumerate(vacancies, page * MY_PAGE_SIZE + 1)
+    ]
+    text = (
+        f"📋 Ваши вакансии ({total_count}):\n\n" + "\n".join(lines) +
+        "\n\nОтметьте заявки, чтобы снять их с публикации или удалить."
+    )
+    return text, kb.get_my_vacancies_keyboard(vacancies, selected, page, total_pages)
+
+
+async def _refresh_my_vacancies(callback: CallbackQuery, state: FSMContext, view: dict,
+                                direction: str = "=", cursor: tuple = None):
+    """Перерисовка списка "Мои вакансии" в сообщении callback"""
+    rendered = await _render_my_vacancies(callback.from_user.id, view, direction, cursor)
+    await state.update_data(my_vacancies=view)
+    if rendered is None:
+        await callback.message.edit_text("У вас больше нет опубликованных вакансий.")
+        return
+    text, markup = rendered
+    await edit_if_changed(callback.message, text, parse_mode="HTML", reply_markup=markup)
+
+
+@router.message(F.text == "📋 Мои вакансии")
+async def my_vacancies(message: Message, state: FSMContext):
+    """Просмотр собственных вакансий"""
+    user = await db.get_user(message.from_user.id)
+    
+    if not user or user['user_type'] != 'company':
+        await message.answer("Только компании могут просматривать свои вакансии!")
+        return
+    
+    view = {'page': 0, 'anchor': None, 'selected': []}
+    rendered = await _render_my_vacancies(message.from_user.id, view)
+    if rendered is None:
+        await message.answer("У вас пока нет опубликованных вакансий.", reply_markup=kb.get_company_menu())
+        return
+    
+    await state.update_data(my_vacancies=view)
+    text, markup = rendered
+    sent = await message.answer(text, parse_mode="HTML", reply_markup=markup)
+    remember_rendered(sent, text, markup)
+
+
+@router.callback_query(F.data.startswith("mypage_"))
+async def paginate_my_vacancies(callback: CallbackQuery, state: FSMContext):
+    """Листание списка "Мои вакансии" по ключу соседней заявки"""
+    view = (await state.get_data()).get('my_vacancies') or {}
+    page, direction, cursor = _parse_page_callback(callback.data)
+    view['page'] = page
+    await _refresh_my_vacancies(callback, state, view, direction, cursor)
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("mysel_"))
+async def toggle_my_vacancy(callback: CallbackQuery, state: FSMContext):
+    """Отметка заявки для массового действия"""
+    view = (await state.get_data()).get('my_vacancies') or {}
+    vacancy_id = int(callback.data.split("_")[1])
+    selected = view.setdefault('selected', [])
+    if vacancy_id in selected:
+        selected.remove(vacancy_id)
+    else:
+        selected.append(vacancy_id)
+    await _refresh_my_vacancies(callback, state, view)
+    await callback.answer()
+
+
+@router.callback_query(F.data == "myrefresh")
+async def refresh_my_vacancies(callback: CallbackQuery, state: FSMContext):
+    """Возврат к списку "Мои вакансии" (отмена удаления)"""
+    view = (await state.get_data()).get('my_vacancies') or {}
+    await _refresh_my_vacancies(callback, state, view)
+    await callback.answer()
+
+
+@router.callback_query(F.data == "myclose")
+async def close_my_vacancies(callback: CallbackQuery, state: FSMContext):
+    """Снятие отмеченных заявок с публикации (перенос в архив)"""
+    view = (await state.get_data()).get('my_vacancies') or {}
+    closed = await db.close_company_vacancies(callback.from_user.id, view.get('selected', []))
+    logger.info("Компания %s сняла с публикации заявок: %d", callback.from_user.id, closed)
+    if closed:
+        browse_cache.invalidate_listings()
+    view['selected'] = []
+    await _refresh_my_vacancies(callback, state, view)
+    await callback.answer(f"Снято с публикации: {closed}")
+
+
+@router.callback_query(F.data == "mydelete")
+async def confirm_delete_my_vacancies(callback: CallbackQuery, state: FSMContext):
+    """Запрос подтверждения удаления отмеченных заявок"""
+    view = (await state.get_data()).get('my_vacancies') or {}
+    count = len(view.get('selected', []))
+    if not count:
+        await callback.answer("Не отмечено ни одной вакансии")
+        return
+    await callback.message.edit_reply_markup(reply_markup=kb.get_confirm_delete_keyboard(count))
+    await callback.answer(f"Удалить вакансий: {count}? Это действие нельзя отменить.", show_alert=True)
+
+
+@router.callback_query(F.data == "mydelete_yes")
+async def delete_my_vacancies(callback: CallbackQuery, state: FSMContext):
+    """Удаление отмеченных заявок"""
+    view = (await state.get_data()).get('my_vacancies') or {}
+    deleted = await db.delete_company_vacancies(callback.from_user.id, view.get('selected', []))
+    logger.info("Компания %s удалила заявок: %d", callback.from_user.id, deleted)
+    if deleted:
+        browse_cache.invalidate_listings()
+    view['selected'] = []
+    await _refresh_my_vacancies(callback, state, view)
+    await callback.answer(f"Удалено: {deleted}")
 
 
 @router.message(F.text == "❌ Отмена")
@@ -349,3 +917,14 @@ async def cancel_action(message: Message, state: FSMContext):
             await message.answer("Действие отменено.", reply_markup=kb.get_company_menu())
         else:
             await message.answer("Действие отменено.", reply_markup=kb.get_recruiter_menu())
+
+
+@router.errors()
+async def handle_error(event: ErrorEvent):
+    """Ошибка обработчика: логируем и считаем обновление обработанным. Иначе в режиме
+    webhook Telegram получит HTTP 500 и доставит то же обновление повторно"""
+    logger.error(
+        "Ошибка обработки обновления %s: %s", event.update.update_id, event.exception,
+        exc_info=event.exception
+    )
+    return True
@@ -30,7 +30,8 @@ def get_recruiter_menu():
     """Меню для рекрутеров"""
     keyboard = ReplyKeyboardMarkup(
         keyboard=[
-            [KeyboardButton(text="📝 Смотреть вакансии")],
+            [KeyboardButton(text="📝 Смотреть вакансии"), KeyboardButton(text="🔥 Популярные")],
+            [KeyboardButton(text="⚙️ Фильтры"), KeyboardButton(text="🔔 Подписки")],
             [KeyboardButton(text="🔙 Главное меню")],
         ],
         resize_keyboard=True
@@ -47,23 +48,133 @@ def get_cancel_keyboard():
     return keyboard
 
 
-def get_pagination_keyboard(current_page: int, total_pages: int):
-    """Клавиатура пагинации для листания вакансий"""
+def get_skip_keyboard():
+    """Клавиатура шага настройки фильтров"""
+    keyboard = ReplyKeyboardMarkup(
+        keyboard=[
+            [KeyboardButton(text="⏭ Пропустить")],
+            [KeyboardButton(text="❌ Отмена")],
+        ],
+        resize_keyboard=True
+    )
+    return keyboard
+
+
+def get_remote_keyboard():
+    """Клавиатура выбора формата работы"""
+    keyboard = ReplyKeyboardMarkup(
+        keyboard=[
+            [KeyboardButton(text="🏠 Только удаленно")],
+            [KeyboardButton(text="🌍 Неважно")],
+            [KeyboardButton(text="❌ Отмена")],
+        ],
+        resize_keyboard=True
+    )
+    return keyboard
+
+
+def get_page_callback(page: int, direction: str = None, cursor: tuple = None, prefix: str = "page"):
+    """Callback data перехода на страницу.
+    
+    Если передан ключ (created_at, id) показанной вакансии, он кодируется в данные,
+    и соседняя страница выбирается поиском по индексу вместо OFFSET:
+    page_<номер>_<n|p>_<created_at>_<id>
+    """
+    if cursor is None:
+        return f"{prefix}_{page}"
+    created_at, vacancy_id = cursor
+    return f"{prefix}_{page}_{direction}_{created_at}_{vacancy_id}"
+
+
+def get_pagination_keyboard(current_page: int, total_pages: int, cursor: tuple = None,
+                            prefix: str = "page", vacancy_id: int = None):
+    """Клавиатура пагинации для листания вакансий (prefix - префикс callback data списка,
+    vacancy_id - для кнопки открытия контакта)"""
     buttons = []
     
     # Кнопки навигации
     nav_buttons = []
     if current_page > 0:
-        nav_buttons.append(InlineKeyboardButton(text="⬅️ Назад", callback_data=f"page_{current_page - 1}"))
+        nav_buttons.append(InlineKeyboardButton(
+            text="⬅️ Назад",
+            callback_data=get_page_callback(current_page - 1, "p", cursor, prefix)
+        ))
     
     nav_buttons.append(InlineKeyboardButton(text=f"{current_page + 1}/{total_pages}", callback_data="current_page"))
     
     if current_page < total_pages - 1:
-        nav_buttons.append(InlineKeyboardButton(text="Вперед ➡️", callback_data=f"page_{current_page + 1}"))
+        nav_buttons.append(InlineKeyboardButton(
+            text="Вперед ➡️",
+            callback_data=get_page_callback(current_page + 1, "n", cursor, prefix)
+        ))
     
     buttons.append(nav_buttons)
     
+    if vacancy_id is not None:
+        buttons.append([InlineKeyboardButton(text="📞 Показать контакт", callback_data=f"contact_{vacancy_id}")])
+    
     # Кнопка закрытия
     buttons.append([InlineKeyboardButton(text="✖️ Закрыть", callback_data="close")])
     
     return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def get_my_vacancies_keyboard(vacancies, selected, current_page: int, total_pages: int):
+    """Клавиатура списка "Мои вакансии": отметка заявок, листание по ключам
+    первой и последней заявки страницы и массовые действия над отмеченными"""
+    buttons = [
+        [InlineKeyboardButton(
+            text=f"{'☑️' if vacancy['id'] in selected else '☐'} {vacancy['title'][:40]}",
+            callback_data=f"mysel_{vacancy['id']}"
+        )]
+        for vacancy in vacancies
+    ]
+    
+    nav_buttons = []
+    if current_page > 0:
+        first = vacancies[0]
+        nav_buttons.append(InlineKeyboardButton(
+            text="⬅️ Назад",
+            callback_data=get_page_callback(current_page - 1, "p", (first['created_at'], first['id']), "mypage")
+        ))
+    nav_buttons.append(InlineKeyboardButton(text=f"{current_page + 1}/{total_pages}", callback_data="current_page"))
+    if current_page < total_pages - 1:
+        last = vacancies[-1]
+        nav_buttons.append(InlineKeyboardButton(
+            text="Вперед ➡️",
+            callback_data=get_page_callback(current_page + 1, "n", (last['created_at'], last['id']), "mypage")
+        ))
+    buttons.append(nav_buttons)
+    
+    if selected:
+        buttons.append([
+            InlineKeyboardButton(text=f"🔒 Снять ({len(selected)})", callback_data="myclose"),
+            InlineKeyboardButton(text=f"🗑 Удалить ({len(selected)})", callback_data="mydelete"),
+        ])
+    buttons.append([InlineKeyboardButton(text="✖️ Закрыть", callback_data="close")])
+    
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def get_confirm_delete_keyboard(count: int):
+    """Подтверждение удаления отмеченных заявок"""
+    return InlineKeyboardMarkup(inline_keyboard=[[
+        InlineKeyboardButton(text=f"🗑 Да, удалить ({count})", callback_data="mydelete_yes"),
+        InlineKeyboardButton(text="↩️ Отмена", callback_data="myrefresh"),
+    ]])
+
+
+def get_contact_keyboard(vacancy_id: int):
+    """Кнопка открытия контакта под вакансией, отправленной через inline-режим"""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="📞 Показать контакт", callback_data=f"contact_{vacancy_id}")]
+    ])
+
+
+def get_subscriptions_keyboard(subscriptions):
+    """Кнопки удаления подписок: subscriptions - пары (id, описание)"""
+    buttons = [
+        [InlineKeyboardButton(text=f"❌ {label}", callback_data=f"unsub_{subscription_id}")]
+        for subscription_id, label in subscriptions
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
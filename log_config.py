@@ -0,0 +1,98 @@
+import json
+import logging
+import logging.handlers
+import queue
+from datetime import datetime
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """Передает запись в очередь как есть: форматирование сообщения и трассировки
+    выполняется в потоке QueueListener, а не в потоке event loop"""
+
+    def prepare(self, record: logging.LogRecord):
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Структурированный вывод: одна JSON-запись на строку"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class LogPipeline:
+    """Неблокирующее логирование: обработчики пишут в очередь, запись на диск
+    и в консоль выполняет фоновый поток QueueListener"""
+
+    def __init__(self, log_file: str = "bot.log", level: str = "INFO", rotation: str = "daily",
+                 max_bytes: int = 10 * 1024 * 1024, backup_count: int = 14, json_format: bool = False):
+        self.level = level
+        formatter = JsonFormatter() if json_format else logging.Formatter(LOG_FORMAT)
+
+        if rotation == "size":
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+            )
+        else:
+            file_handler = logging.handlers.TimedRotatingFileHandler(
+                log_file, when="midnight", backupCount=backup_count, encoding="utf-8"
+            )
+        stream_handler = logging.StreamHandler()
+        for handler in (file_handler, stream_handler):
+            handler.setFormatter(formatter)
+        self.handlers = [file_handler, stream_handler]
+
+        self._queue = queue.SimpleQueue()
+        self._listeners = []
+
+    def start(self):
+        """Подключение очереди к корневому логгеру и запуск фонового потока"""
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(LazyQueueHandler(self._queue))
+        root.setLevel(self.level)
+
+        listener = logging.handlers.QueueListener(self._queue, *self.handlers, respect_handler_level=True)
+        listener.start()
+        self._listeners.append(listener)
+
+    def worker_queue(self, context):
+        """Очередь для записей из процессов-воркеров (multiprocessing context)"""
+        worker_queue = context.Queue()
+        listener = logging.handlers.QueueListener(worker_queue, *self.handlers, respect_handler_level=True)
+        listener.start()
+        self._listeners.append(listener)
+        return worker_queue
+
+    def stop(self):
+        """Дописывает оставшиеся записи и закрывает файлы"""
+        for listener in reversed(self._listeners):
+            listener.stop()
+        self._listeners = []
+        for handler in self.handlers:
+            handler.close()
+
+
+def setup_worker_logging(worker_queue, level: str = "INFO"):
+    """Логирование в процессе-воркере: записи уходят в очередь супервизора.
+
+    Между процессами записи передаются через pickle, поэтому сообщение форматируется
+    стандартным QueueHandler до отправки.
+    """
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(worker_queue))
+    root.setLevel(level)
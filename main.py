@@ -1,60 +1,154 @@
 import asyncio
 import logging
-from datetime import datetime
+import signal
 
+from aiohttp import web
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
+import analytics
 import config
 import database as db
+import metrics
 from handlers import router
-
-# Настройка логирования
-log_filename = f"bot_{datetime.now().strftime('%Y%m%d')}.log"
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_filename, encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+from log_config import LogPipeline
+from maintenance import Maintenance
+from notifier import Notifier
+from storage import SQLiteStorage
+from supervisor import Supervisor
+from throttling import ConcurrencyMiddleware
+from writer import GroupCommitWriter
 
 logger = logging.getLogger(__name__)
 
 
+async def run_webhook(bot: Bot, dp: Dispatcher):
+    """Прием обновлений через webhook на aiohttp-сервере"""
+    app = web.Application()
+    # Обработка внутри запроса: при остановке сервер дождется незавершенных обновлений
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        handle_in_background=False,
+        secret_token=config.WEBHOOK_SECRET,
+    ).register(app, path=config.WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    
+    runner = web.AppRunner(app, shutdown_timeout=30)
+    await runner.setup()
+    site = web.TCPSite(runner, host=config.WEBAPP_HOST, port=config.WEBAPP_PORT)
+    await site.start()
+    
+    if config.WEBHOOK_URL:
+        await bot.set_webhook(
+            url=config.WEBHOOK_URL.rstrip("/") + config.WEBHOOK_PATH,
+            secret_token=config.WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+        logger.info("Webhook установлен: %s", config.WEBHOOK_URL)
+    
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+    
+    logger.info(
+        "Бот запущен в режиме webhook: http://%s:%s%s",
+        config.WEBAPP_HOST, config.WEBAPP_PORT, config.WEBHOOK_PATH
+    )
+    try:
+        await stop_event.wait()
+    finally:
+        logger.info("Остановка webhook-сервера...")
+        await runner.cleanup()
+
+
 async def main():
     """Главная функция запуска бота"""
     logger.info("=" * 50)
     logger.info("Запуск бота...")
     
     # Инициализация базы данных
+    await db.pool.open(readers=config.DB_READERS)
     await db.init_db()
+    db.write_queue = GroupCommitWriter(config.WRITE_BATCH_SIZE, config.WRITE_BATCH_DELAY)
+    db.write_queue.start(db.pool)
     logger.info("База данных инициализирована")
     
     # Инициализация бота и диспетчера
     bot = Bot(token=config.BOT_TOKEN)
-    dp = Dispatcher(storage=MemoryStorage())
+    storage = SQLiteStorage(db.pool) if config.FSM_STORAGE == "sqlite" else MemoryStorage()
+    dp = Dispatcher(storage=storage)
     
     # Регистрация роутеров
     dp.include_router(router)
+    metrics.setup_middlewares(dp)
+    dp.update.outer_middleware(ConcurrencyMiddleware(
+        config.MAX_CONCURRENT_UPDATES, config.USER_QUEUE_SIZE, config.OVERLOAD_QUEUE_SIZE
+    ))
     logger.info("Обработчики зарегистрированы")
     
+    metrics_server = metrics.MetricsServer(
+        config.METRICS_HOST, config.METRICS_PORT, config.METRICS_LOG_INTERVAL
+    )
+    await metrics_server.start()
+    
+    # Рассылка уведомлений подписчикам в фоне
+    notifier = Notifier(bot, config.NOTIFY_GLOBAL_RATE, config.NOTIFY_CHAT_RATE)
+    await notifier.start()
+    analytics.aggregator.start(config.STATS_FLUSH_INTERVAL)
+    
+    # Архивирование устаревших заявок и VACUUM/ANALYZE по расписанию
+    maintenance = Maintenance(config.VACANCY_RETENTION_DAYS, config.MAINTENANCE_HOURS)
+    maintenance.start()
+    
     try:
-        # Запуск polling
-        logger.info("Бот запущен и готов к работе!")
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        if config.BOT_MODE == "webhook":
+            await run_webhook(bot, dp)
+        else:
+            # Запуск polling
+            logger.info("Бот запущен и готов к работе!")
+            # Сверх этого числа задач polling перестает забирать новые обновления
+            await dp.start_polling(
+                bot,
+                allowed_updates=dp.resolve_used_update_types(),
+                tasks_concurrency_limit=config.MAX_CONCURRENT_UPDATES + config.OVERLOAD_QUEUE_SIZE,
+            )
     except Exception as e:
-        logger.error(f"Ошибка при работе бота: {e}", exc_info=True)
+        logger.error("Ошибка при работе бота: %s", e, exc_info=True)
     finally:
+        await maintenance.stop()
+        await analytics.aggregator.stop()
+        await notifier.stop()
+        await metrics_server.stop()
         await bot.session.close()
+        await db.write_queue.stop()
+        await db.pool.close()
+        logger.info("Кэш пользователей: %s", db.user_cache.stats())
         logger.info("Бот остановлен")
 
 
 if __name__ == "__main__":
+    # Настройка логирования: запись в файл и консоль в фоновом потоке
+    log_pipeline = LogPipeline(
+        log_file=config.LOG_FILE,
+        level=config.LOG_LEVEL,
+        rotation=config.LOG_ROTATION,
+        max_bytes=config.LOG_MAX_BYTES,
+        backup_count=config.LOG_BACKUP_COUNT,
+        json_format=config.LOG_JSON,
+    )
+    log_pipeline.start()
+    
     try:
-        asyncio.run(main())
+        if config.BOT_WORKERS > 1:
+            asyncio.run(Supervisor(config.BOT_WORKERS, log_pipeline).run())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Бот остановлен пользователем")
     except Exception as e:
-        logger.critical(f"Критическая ошибка: {e}", exc_info=True)
+        logger.critical("Критическая ошибка: %s", e, exc_info=True)
+    finally:
+        log_pipeline.stop()
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+
+import database as db
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Заявок за одну транзакцию переноса и пауза между порциями, чтобы не занимать писателя надолго
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_BATCH_PAUSE = 0.2
+
+# Страниц, освобождаемых за один шаг incremental_vacuum
+VACUUM_STEP_PAGES = 2000
+
+
+def parse_hours(value: str):
+    """Окно обслуживания "3-5" -> (3, 5): часы локального времени, конец не включается"""
+    start, _, end = value.partition("-")
+    return int(start), int(end or int(start) + 1)
+
+
+def in_window(hours, now: datetime = None) -> bool:
+    start, end = hours
+    hour = (now or datetime.now()).hour
+    if start <= end:
+        return start <= hour < end
+    # Окно через полночь, например 23-2
+    return hour >= start or hour < end
+
+
+class Maintenance:
+    """Фоновое обслуживание базы: построение недостающих MinHash-подписей и перенос
+    устаревших заявок в архив порциями, а в окно низкой нагрузки - incremental VACUUM
+    и ANALYZE раз в сутки"""
+
+    def __init__(self, retention_days: int, hours: str = "3-5", interval: float = 300.0):
+        self.retention_days = retention_days
+        self.hours = parse_hours(hours)
+        self.interval = interval
+        self._task = None
+        self._last_offpeak_day = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+        logger.info(
+            "Обслуживание базы запущено: хранение заявок %s дн., окно %02d-%02d ч",
+            self.retention_days or "∞", *self.hours
+        )
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Ошибка обслуживания базы: %s", e, exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self):
+        await self.backfill_signatures()
+        if self.retention_days > 0:
+            await self.archive_expired()
+
+        today = datetime.now().date()
+        if in_window(self.hours) and self._last_offpeak_day != today:
+            await self.offpeak()
+            self._last_offpeak_day = today
+
+        stats = await db.get_storage_stats()
+        metrics.set_gauge("db_page_count", stats["page_count"])
+        metrics.set_gauge("db_freelist_pages", stats["freelist_count"])
+        metrics.set_gauge("maintenance_last_run_timestamp", time.time())
+
+    async def backfill_signatures(self):
+        """Подписи для заявок старых баз и массового импорта: строятся после запуска,
+        а не в init_db, чтобы время старта не зависело от размера таблицы"""
+        built = 0
+        while True:
+            batch = await db.backfill_minhash(ARCHIVE_BATCH_SIZE)
+            if not batch:
+                break
+            built += batch
+            metrics.inc("maintenance_minhash_built_total", batch)
+            await asyncio.sleep(ARCHIVE_BATCH_PAUSE)
+        if built:
+            logger.info("MinHash-подписи построены для %d заявок", built)
+
+    async def archive_expired(self):
+        """Перенос всех заявок старше срока хранения порциями по ARCHIVE_BATCH_SIZE"""
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+        metrics.set_gauge("maintenance_expired_pending", await db.count_expired_vacancies(cutoff))
+
+        archived = 0
+        while True:
+            started = time.perf_counter()
+            moved = await db.archive_vacancies(cutoff, ARCHIVE_BATCH_SIZE)
+            if not moved:
+                break
+            archived += moved
+            metrics.observe("maintenance_archive_batch_seconds", time.perf_counter() - started)
+            metrics.inc("maintenance_archived_total", moved)
+            await asyncio.sleep(ARCHIVE_BATCH_PAUSE)
+
+        metrics.set_gauge("maintenance_expired_pending", 0)
+        if archived:
+            logger.info("Перенесено в архив заявок: %d", archived)
+
+    async def offpeak(self):
+        """Освобождение места и обновление статистики планировщика"""
+        stats = await db.get_storage_stats()
+        started = time.perf_counter()
+        if stats["auto_vacuum"] != 2:
+            # Однократный полный VACUUM переводит существующую базу в режим INCREMENTAL
+            logger.info("Полный VACUUM для включения auto_vacuum = INCREMENTAL (%d стр.)", stats["page_count"])
+            await db.vacuum()
+        else:
+            freed = 0
+            while freed < stats["freelist_count"]:
+                await db.vacuum(VACUUM_STEP_PAGES)
+                freed += VACUUM_STEP_PAGES
+                await asyncio.sleep(ARCHIVE_BATCH_PAUSE)
+        metrics.observe("maintenance_vacuum_seconds", time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await db.analyze()
+        metrics.observe("maintenance_analyze_seconds", time.perf_counter() - started)
+        logger.info("Обслуживание базы: VACUUM и ANALYZE выполнены")
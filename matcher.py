@@ -0,0 +1,87 @@
+import bisect
+import re
+
+_TOKEN_RE = re.compile(r"[\w+#]+")
+
+
+def normalize_keyword(text: str) -> str:
+    """Ключевые слова подписки в виде для сравнения с текстом заявки"""
+    return " ".join(tokenize(text))
+
+
+def tokenize(text: str):
+    """Слова текста в нижнем регистре: "Python/Django, C++" -> ["python", "django", "c++"]"""
+    return _TOKEN_RE.findall((text or "").casefold().replace("ё", "е"))
+
+
+class SubscriptionMatcher:
+    """Инвертированный индекс подписок для поиска подписчиков новой заявки.
+
+    Ключевые слова индексируются по первому слову фразы: для заявки просматриваются
+    только подписки на встречающиеся в ней слова, поэтому время сопоставления
+    пропорционально числу слов заявки, а не числу подписок. Города и удаленка
+    хранятся корзинами, пороги зарплаты - в отсортированном списке.
+    """
+
+    def __init__(self):
+        self.keywords = {}  # первое слово -> {subscription_id: (user_id, остальные слова)}
+        self.cities = {}  # город -> {subscription_id: user_id}
+        self.remote = {}  # subscription_id -> user_id
+        self.salaries = []  # отсортированные (порог, subscription_id, user_id)
+        self._index = {}  # subscription_id -> (kind, value, user_id)
+        self.last_id = 0
+
+    def __len__(self):
+        return len(self._index)
+
+    def add(self, subscription_id: int, user_id: int, kind: str, value: str):
+        """Добавление подписки в индекс"""
+        if subscription_id in self._index:
+            return
+        if kind == "keyword":
+            tokens = tokenize(value)
+            if not tokens:
+                return
+            self.keywords.setdefault(tokens[0], {})[subscription_id] = (user_id, tuple(tokens[1:]))
+        elif kind == "city":
+            self.cities.setdefault(value, {})[subscription_id] = user_id
+        elif kind == "remote":
+            self.remote[subscription_id] = user_id
+        elif kind == "salary":
+            bisect.insort(self.salaries, (int(value), subscription_id, user_id))
+        else:
+            return
+        self._index[subscription_id] = (kind, value, user_id)
+        self.last_id = max(self.last_id, subscription_id)
+
+    def load(self, rows):
+        """Построение индекса заново по строкам subscriptions (id, user_id, kind, value)"""
+        self.__init__()
+        for row in rows:
+            self.add(row['id'], row['user_id'], row['kind'], row['value'])
+
+    def match(self, vacancy) -> set:
+        """Идентификаторы пользователей, подписки которых подходят под заявку"""
+        users = set()
+
+        tokens = set(tokenize(f"{vacancy['title']} {vacancy['description']}"))
+        for token in tokens:
+            bucket = self.keywords.get(token)
+            if bucket is None:
+                continue
+            for user_id, rest in bucket.values():
+                if all(word in tokens for word in rest):
+                    users.add(user_id)
+
+        if vacancy['city']:
+            users.update(self.cities.get(vacancy['city'], {}).values())
+        if vacancy['is_remote']:
+            users.update(self.remote.values())
+
+        salary_top = vacancy['salary_max'] or vacancy['salary_min']
+        if salary_top:
+            # Все пороги не выше верхней границы зарплаты заявки
+            end = bisect.bisect_right(self.salaries, (salary_top, float("inf")))
+            users.update(user_id for _, _, user_id in self.salaries[:end])
+
+        return users
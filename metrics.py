@@ -0,0 +1,234 @@
+import asyncio
+import functools
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict
+
+from aiohttp import web
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyStats:
+    """Скользящее окно последних замеров для квантилей и накопительные count/sum"""
+
+    __slots__ = ("samples", "count", "total")
+
+    def __init__(self, window: int = 2048):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def quantiles(self):
+        if not self.samples:
+            return {q: 0.0 for q in QUANTILES}
+        ordered = sorted(self.samples)
+        last = len(ordered) - 1
+        return {q: ordered[min(int(q * len(ordered)), last)] for q in QUANTILES}
+
+
+def _labels_key(labels: dict):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra: dict = None):
+    items = list(labels) + list((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса: задержки, счетчики и значения (gauge)"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.counters = {}
+        self.gauges = {}
+        self._collectors = []
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, _labels_key(labels))
+        stats = self.latencies.get(key)
+        if stats is None:
+            stats = self.latencies[key] = LatencyStats()
+        stats.observe(seconds)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _labels_key(labels))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        self.gauges[(name, _labels_key(labels))] = value
+
+    def register_collector(self, collector: Callable[[], None]):
+        """Функция, обновляющая gauge-метрики перед выгрузкой (размеры кэшей, очередей и т.п.)"""
+        self._collectors.append(collector)
+
+    def collect(self):
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.error("Ошибка сборщика метрик: %s", e)
+
+    def render(self) -> str:
+        """Выгрузка в текстовом формате Prometheus"""
+        self.collect()
+        lines = []
+        seen_types = set()
+
+        def type_line(name: str, kind: str):
+            if name not in seen_types:
+                seen_types.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), stats in sorted(self.latencies.items()):
+            type_line(name, "summary")
+            for q, value in stats.quantiles().items():
+                lines.append(f"{name}{_format_labels(labels, {'quantile': q})} {value:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {stats.count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {stats.total:.6f}")
+
+        for (name, labels), value in sorted(self.counters.items()):
+            type_line(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), value in sorted(self.gauges.items()):
+            type_line(name, "gauge")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """Короткая сводка для периодической строки в логе"""
+        updates = sum(v for (name, _), v in self.counters.items() if name == "bot_updates_total")
+        errors = sum(v for (name, _), v in self.counters.items() if name == "bot_handler_errors_total")
+
+        def worst_p95(metric: str):
+            values = [stats.quantiles()[0.95] for (name, _), stats in self.latencies.items() if name == metric]
+            return max(values) * 1000 if values else 0.0
+
+        return (
+            f"обновлений: {updates}, ошибок: {errors}, "
+            f"p95 обработчиков: {worst_p95('bot_handler_seconds'):.1f} мс, "
+            f"p95 запросов БД: {worst_p95('db_query_seconds'):.1f} мс, "
+            f"p95 ожидания соединения: {worst_p95('db_acquire_seconds'):.1f} мс"
+        )
+
+
+registry = MetricsRegistry()
+observe = registry.observe
+inc = registry.inc
+set_gauge = registry.set_gauge
+register_collector = registry.register_collector
+
+
+def timed_query(func):
+    """Декоратор для функций database.py: время выполнения запроса"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            registry.observe("db_query_seconds", time.perf_counter() - started, query=func.__name__)
+    return wrapper
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Задержка, количество вызовов и ошибок по каждому обработчику"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = handler_object.callback.__name__ if handler_object else "unknown"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            registry.inc("bot_handler_errors_total", handler=name)
+            raise
+        finally:
+            registry.observe("bot_handler_seconds", time.perf_counter() - started, handler=name)
+            registry.inc("bot_handler_calls_total", handler=name)
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Количество и полное время обработки обновлений по типам (включая необработанные)"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        event_type = getattr(event, "event_type", "unknown")
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            registry.observe("bot_update_seconds", time.perf_counter() - started, type=event_type)
+            registry.inc("bot_updates_total", type=event_type)
+
+
+def setup_middlewares(dp: Dispatcher):
+    """Подключение middleware метрик к диспетчеру"""
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    handler_middleware = HandlerMetricsMiddleware()
+    for observer in (dp.message, dp.callback_query, dp.inline_query):
+        observer.middleware(handler_middleware)
+
+
+class MetricsServer:
+    """Локальный HTTP-эндпоинт /metrics и периодическая сводка в логе"""
+
+    def __init__(self, host: str, port: int, log_interval: float = 60.0):
+        self.host = host
+        self.port = port
+        self.log_interval = log_interval
+        self._runner = None
+        self._log_task = None
+
+    async def _handle(self, request: web.Request):
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    async def _log_summary(self):
+        while True:
+            await asyncio.sleep(self.log_interval)
+            logger.info("Метрики: %s", registry.summary())
+
+    async def start(self):
+        if self.port:
+            app = web.Application()
+            app.router.add_get("/metrics", self._handle)
+            self._runner = web.AppRunner(app, access_log=None)
+            await self._runner.setup()
+            await web.TCPSite(self._runner, host=self.host, port=self.port).start()
+            logger.info("Метрики доступны на http://%s:%s/metrics", self.host, self.port)
+        if self.log_interval > 0:
+            self._log_task = asyncio.create_task(self._log_summary())
+
+    async def stop(self):
+        if self._log_task is not None:
+            self._log_task.cancel()
+            await asyncio.gather(self._log_task, return_exceptions=True)
+            self._log_task = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        logger.info("Метрики: %s", registry.summary())
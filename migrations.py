@@ -0,0 +1,486 @@
+"""Версионированные миграции схемы базы.
+
+Номер примененной миграции хранится в PRAGMA user_version. При запуске выполняются
+только новые миграции, каждая в своей транзакции вместе с повышением версии;
+на актуальной базе init_db ограничивается чтением user_version.
+
+Миграции идемпотентны (IF NOT EXISTS, проверка колонок): базы, созданные до появления
+миграций, имеют user_version = 0 и проходят весь список, не теряя данных.
+Новые миграции добавляются в конец MIGRATIONS со следующим номером.
+"""
+import logging
+from datetime import datetime
+
+import dedup
+from normalize import parse_salary, vacancy_fields
+
+logger = logging.getLogger(__name__)
+
+# Колонки, вычисляемые из свободного текста salary/location (normalize.vacancy_fields)
+STRUCTURED_COLUMNS = (
+    ("salary_min", "INTEGER"),
+    ("salary_max", "INTEGER"),
+    ("salary_currency", "TEXT"),
+    ("city", "TEXT"),
+    ("is_remote", "INTEGER NOT NULL DEFAULT 0"),
+)
+
+# Верхняя граница зарплаты; для "от X" совпадает с нижней. Используется и в индексе, и в фильтре
+SALARY_TOP = "COALESCE(salary_max, salary_min)"
+
+
+# Построчные триггеры вставки. Массовый импорт (cli.py) снимает их на время загрузки
+# и обновляет счетчик и FTS-индекс одним запросом
+COUNT_INSERT_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS trg_vacancies_count_insert
+    AFTER INSERT ON vacancies
+    BEGIN
+        UPDATE counters SET value = value + 1 WHERE name = 'vacancies';
+    END
+"""
+
+FTS_INSERT_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS trg_vacancies_fts_insert
+    AFTER INSERT ON vacancies
+    BEGIN
+        INSERT INTO vacancies_fts (rowid, title, description, location)
+        VALUES (NEW.id, NEW.title, NEW.description, NEW.location);
+    END
+"""
+
+
+async def _columns(db, table: str):
+    async with db.execute(f"PRAGMA table_info({table})") as cursor:
+        return {row['name'] for row in await cursor.fetchall()}
+
+
+async def _add_column(db, table: str, column: str, definition: str) -> bool:
+    """Добавление колонки, если ее еще нет; True, если колонка добавлена"""
+    if column in await _columns(db, table):
+        return False
+    await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return True
+
+
+async def _backfill_structured_fields(db, batch_size: int = 1000):
+    """Заполнение структурированных полей для заявок, созданных до их появления"""
+    last_id = 0
+    updated = 0
+    while True:
+        async with db.execute(
+            "SELECT id, salary, location FROM vacancies WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_size)
+        ) as cursor:
+            rows = await cursor.fetchall()
+        if not rows:
+            break
+        await db.executemany("""
+            UPDATE vacancies
+            SET salary_min = ?, salary_max = ?, salary_currency = ?, city = ?, is_remote = ?
+            WHERE id = ?
+        """, [(*vacancy_fields(row['salary'], row['location']), row['id']) for row in rows])
+        last_id = rows[-1]['id']
+        updated += len(rows)
+    if updated:
+        logger.info("Структурированные поля заполнены для %d заявок", updated)
+
+
+async def backfill_minhash(db, batch_size: int = 1000, max_batches: int = None):
+    """MinHash-подписи и LSH-бакеты для заявок без подписи (созданных до появления
+    дедупликации или загруженных импортом). Транзакцию фиксирует вызывающий код.
+    Возвращает количество обработанных заявок"""
+    updated = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        async with db.execute(
+            "SELECT id, title, description FROM vacancies WHERE minhash IS NULL LIMIT ?", (batch_size,)
+        ) as cursor:
+            rows = await cursor.fetchall()
+        if not rows:
+            break
+        signatures = [(row['id'], dedup.signature(row['title'], row['description'])) for row in rows]
+        await db.executemany(
+            "UPDATE vacancies SET minhash = ? WHERE id = ?",
+            [(dedup.to_blob(values), vacancy_id) for vacancy_id, values in signatures]
+        )
+        await db.executemany(
+            "INSERT OR IGNORE INTO vacancy_lsh (band, bucket, vacancy_id) VALUES (?, ?, ?)",
+            [(band, bucket, vacancy_id) for vacancy_id, values in signatures
+             for band, bucket in dedup.band_keys(values)]
+        )
+        updated += len(rows)
+        batches += 1
+    return updated
+
+
+async def _m001_base(db):
+    """Пользователи, состояния FSM, заявки и счетчик заявок"""
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            user_type TEXT,
+            company_name TEXT,
+            contact TEXT,
+            created_at TEXT
+        )
+    """)
+
+    # Состояния FSM (storage.SQLiteStorage)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS fsm_storage (
+            key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT
+        )
+    """)
+
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS vacancies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            company_id INTEGER,
+            title TEXT,
+            description TEXT,
+            salary TEXT,
+            location TEXT,
+            contact TEXT,
+            created_at TEXT,
+            FOREIGN KEY (company_id) REFERENCES users (user_id)
+        )
+    """)
+
+    # Индекс для keyset-пагинации по ключу (created_at, id)
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vacancies_created
+        ON vacancies (created_at, id)
+    """)
+
+    # Счетчики, поддерживаемые триггерами вместо SELECT COUNT(*).
+    # Начальное значение считается один раз за жизнь базы
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    """)
+    await db.execute("""
+        INSERT OR IGNORE INTO counters (name, value)
+        SELECT 'vacancies', COUNT(*) FROM vacancies
+    """)
+    await db.execute(COUNT_INSERT_TRIGGER)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_vacancies_count_delete
+        AFTER DELETE ON vacancies
+        BEGIN
+            UPDATE counters SET value = value - 1 WHERE name = 'vacancies';
+        END
+    """)
+
+
+async def _m002_test_vacancies(db):
+    """Тестовые заявки в новой базе"""
+    async with db.execute("SELECT 1 FROM vacancies LIMIT 1") as cursor:
+        if await cursor.fetchone() is not None:
+            return
+
+    now = datetime.now().isoformat()
+    test_vacancies = [
+        (999001, "Senior Python Developer",
+         "Ищем опытного Python разработчика для работы над backend системами. "
+         "Требования: Python 3.9+, FastAPI/Django, PostgreSQL, Docker.",
+         "250,000 - 350,000 руб", "Москва (удаленно)", "@tech_company_hr", now),
+
+        (999002, "Frontend React Developer",
+         "Разработка современных веб-приложений на React. "
+         "Требования: React 18+, TypeScript, Redux, опыт от 2 лет.",
+         "180,000 - 280,000 руб", "Санкт-Петербург", "@spb_tech_hr", now),
+
+        (999003, "DevOps Engineer",
+         "Настройка и поддержка CI/CD, управление инфраструктурой. "
+         "Требования: Kubernetes, AWS/GCP, Terraform, Ansible.",
+         "200,000 - 300,000 руб", "Москва", "@devops_company", now),
+
+        (999004, "Data Scientist",
+         "Анализ данных, построение ML моделей. "
+         "Требования: Python, pandas, scikit-learn, PyTorch/TensorFlow.",
+         "220,000 - 320,000 руб", "Удаленно", "@data_team_lead", now),
+
+        (999005, "QA Automation Engineer",
+         "Автоматизация тестирования веб и мобильных приложений. "
+         "Требования: Python/Java, Selenium, Pytest, опыт от 1 года.",
+         "150,000 - 220,000 руб", "Казань", "@qa_manager", now),
+    ]
+    # Структурированные поля, FTS-индекс и подписи заполнят следующие миграции
+    await db.executemany("""
+        INSERT INTO vacancies (company_id, title, description, salary, location, contact, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, test_vacancies)
+    logger.info("Тестовые данные успешно добавлены")
+
+
+async def _m003_structured_fields(db):
+    """Структурированные поля зарплаты и локации для фильтров в SQL"""
+    added_columns = False
+    for column, definition in STRUCTURED_COLUMNS:
+        added_columns |= await _add_column(db, "vacancies", column, definition)
+    if added_columns:
+        await _backfill_structured_fields(db)
+
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vacancies_city
+        ON vacancies (city, created_at, id)
+    """)
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vacancies_remote
+        ON vacancies (is_remote, created_at, id)
+    """)
+    await db.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_vacancies_salary
+        ON vacancies ({SALARY_TOP}, created_at, id)
+    """)
+
+
+async def _m004_fts(db):
+    """Полнотекстовый индекс FTS5 по заявкам (external content, синхронизируется триггерами)"""
+    async with db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'vacancies_fts'"
+    ) as cursor:
+        fts_exists = await cursor.fetchone() is not None
+
+    await db.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS vacancies_fts USING fts5(
+            title, description, location,
+            content='vacancies', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    await db.execute(FTS_INSERT_TRIGGER)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_vacancies_fts_delete
+        AFTER DELETE ON vacancies
+        BEGIN
+            INSERT INTO vacancies_fts (vacancies_fts, rowid, title, description, location)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.location);
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_vacancies_fts_update
+        AFTER UPDATE OF title, description, location ON vacancies
+        BEGIN
+            INSERT INTO vacancies_fts (vacancies_fts, rowid, title, description, location)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.location);
+            INSERT INTO vacancies_fts (rowid, title, description, location)
+            VALUES (NEW.id, NEW.title, NEW.description, NEW.location);
+        END
+    """)
+    if not fts_exists:
+        # Индексируем заявки, созданные до появления FTS-таблицы
+        await db.execute("INSERT INTO vacancies_fts (vacancies_fts) VALUES ('rebuild')")
+
+
+async def _m005_version(db):
+    """Версия заявки: ключ кэша отрисованных карточек (browse_cache), растет при правке"""
+    await _add_column(db, "vacancies", "version", "INTEGER NOT NULL DEFAULT 1")
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_vacancies_version
+        AFTER UPDATE OF title, description, salary, location, contact ON vacancies
+        BEGIN
+            UPDATE vacancies SET version = version + 1 WHERE id = NEW.id;
+        END
+    """)
+
+
+async def _m006_minhash(db):
+    """Поиск повторных публикаций: MinHash-подпись заявки и ее LSH-бакеты (dedup.py).
+    Подписи существующих заявок строятся в фоне (maintenance.py)"""
+    await _add_column(db, "vacancies", "minhash", "BLOB")
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS vacancy_lsh (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            vacancy_id INTEGER NOT NULL,
+            PRIMARY KEY (band, bucket, vacancy_id)
+        ) WITHOUT ROWID
+    """)
+    # Частичный индекс: заявки без подписи находятся без полного просмотра таблицы
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vacancies_no_minhash
+        ON vacancies (id) WHERE minhash IS NULL
+    """)
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vacancy_lsh_vacancy
+        ON vacancy_lsh (vacancy_id)
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_vacancies_lsh_delete
+        AFTER DELETE ON vacancies
+        BEGIN
+            DELETE FROM vacancy_lsh WHERE vacancy_id = OLD.id;
+        END
+    """)
+
+
+async def _m007_stats(db):
+    """Просмотры и открытия контактов (пишутся пачками из analytics.py)"""
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS vacancy_stats (
+            vacancy_id INTEGER PRIMARY KEY,
+            views INTEGER NOT NULL DEFAULT 0,
+            contacts INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vacancy_stats_views
+        ON vacancy_stats (views)
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_vacancies_stats_delete
+        AFTER DELETE ON vacancies
+        BEGIN
+            DELETE FROM vacancy_stats WHERE vacancy_id = OLD.id;
+        END
+    """)
+
+
+async def _m008_notifications(db):
+    """Подписки рекрутеров и очередь уведомлений (notifier.py)"""
+    # kind: keyword (слова в тексте), city, remote или salary (порог зарплаты)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS subscriptions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            value TEXT NOT NULL,
+            created_at TEXT,
+            UNIQUE (user_id, kind, value)
+        )
+    """)
+
+    # Заявки, по которым еще не разосланы уведомления
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS notification_jobs (
+            vacancy_id INTEGER PRIMARY KEY,
+            created_at TEXT
+        )
+    """)
+
+    # Очередь отправки уведомлений: переживает перезапуск бота
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS notification_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id INTEGER NOT NULL,
+            vacancy_id INTEGER NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0
+        )
+    """)
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_outbox_due
+        ON notification_outbox (next_attempt_at, id)
+    """)
+
+
+async def _m009_archive(db):
+    """Архив устаревших заявок: переносятся из vacancies фоновым обслуживанием"""
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS vacancies_archive (
+            id INTEGER PRIMARY KEY,
+            company_id INTEGER,
+            title TEXT,
+            description TEXT,
+            salary TEXT,
+            location TEXT,
+            contact TEXT,
+            created_at TEXT,
+            salary_min INTEGER,
+            salary_max INTEGER,
+            salary_currency TEXT,
+            city TEXT,
+            is_remote INTEGER NOT NULL DEFAULT 0,
+            version INTEGER NOT NULL DEFAULT 1,
+            views INTEGER NOT NULL DEFAULT 0,
+            contacts INTEGER NOT NULL DEFAULT 0,
+            archived_at TEXT
+        )
+    """)
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vacancies_archive_company
+        ON vacancies_archive (company_id, created_at)
+    """)
+
+
+async def _m010_company_index(db):
+    """Список "Мои вакансии": заявки компании по ключу (created_at, id)"""
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vacancies_company
+        ON vacancies (company_id, created_at, id)
+    """)
+
+
+async def _m011_salary_ranges(db, batch_size: int = 1000):
+    """Повторный разбор зарплат: множитель после диапазона ("150-200 тыс") раньше
+    применялся только ко второму числу, дробные значения ("2.5 млн") не распознавались"""
+    last_id = 0
+    updated = 0
+    while True:
+        async with db.execute(
+            "SELECT id, salary, salary_min, salary_max FROM vacancies WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_size)
+        ) as cursor:
+            rows = await cursor.fetchall()
+        if not rows:
+            break
+        changed = []
+        for row in rows:
+            salary_min, salary_max, _ = parse_salary(row['salary'])
+            if (salary_min, salary_max) != (row['salary_min'], row['salary_max']):
+                changed.append((salary_min, salary_max, row['id']))
+        await db.executemany("UPDATE vacancies SET salary_min = ?, salary_max = ? WHERE id = ?", changed)
+        last_id = rows[-1]['id']
+        updated += len(changed)
+    if updated:
+        logger.info("Зарплата разобрана заново для %d заявок", updated)
+
+
+# (номер, миграция) по возрастанию номеров; номера примененных миграций не меняются
+MIGRATIONS = (
+    (1, _m001_base),
+    (2, _m002_test_vacancies),
+    (3, _m003_structured_fields),
+    (4, _m004_fts),
+    (5, _m005_version),
+    (6, _m006_minhash),
+    (7, _m007_stats),
+    (8, _m008_notifications),
+    (9, _m009_archive),
+    (10, _m010_company_index),
+    (11, _m011_salary_ranges),
+)
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+async def get_version(db) -> int:
+    async with db.execute("PRAGMA user_version") as cursor:
+        return (await cursor.fetchone())[0]
+
+
+async def migrate(db):
+    """Применение новых миграций на пишущем соединении; возвращает (старая версия, новая версия)"""
+    current = await get_version(db)
+    if current >= LATEST_VERSION:
+        return current, current
+
+    for version, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            await migration(db)
+            await db.execute(f"PRAGMA user_version = {version}")
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+        logger.info("Миграция %d применена: %s", version, migration.__doc__.splitlines()[0])
+    return current, LATEST_VERSION
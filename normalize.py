@@ -0,0 +1,83 @@
+import re
+
+# Число с разделителями разрядов ("250,000", "250 000", "250.000") или дробной частью ("2.5")
+# и необязательным множителем "k"/"к"/"тыс"/"млн"
+_NUMBER_RE = re.compile(r"(\d{1,3}(?:[\s,. ]\d{3})+(?!\d)|\d+(?:[.,]\d{1,2}(?!\d))?)\s*([kкKК]|тыс|млн)?")
+
+_MULTIPLIERS = {"млн": 1000000}
+
+_CURRENCIES = (
+    ("RUB", ("₽", "руб", "rub", "р.")),
+    ("USD", ("$", "usd", "долл")),
+    ("EUR", ("€", "eur", "евро")),
+)
+
+_REMOTE_RE = re.compile(r"удал[её]нн?о|удал[её]нк\w*|remote", re.IGNORECASE)
+
+
+def parse_salary(text: str):
+    """Разбор зарплаты из свободного текста: (salary_min, salary_max, currency).
+
+    "250,000 - 350,000 руб" -> (250000, 350000, "RUB"), "от 100к" -> (100000, None, None),
+    "150-200 тыс. руб" -> (150000, 200000, "RUB"). Нераспознанные части возвращаются как None.
+    """
+    if not text:
+        return None, None, None
+
+    lowered = text.lower()
+    parsed = []
+    for digits, suffix in _NUMBER_RE.findall(lowered):
+        if re.fullmatch(r"\d+[.,]\d{1,2}", digits):
+            number = float(digits.replace(",", "."))
+        else:
+            number = int(re.sub(r"\D", "", digits))
+        parsed.append((number, _MULTIPLIERS.get(suffix, 1000) if suffix else 1))
+
+    # Множитель после диапазона относится к обоим концам: "2.5 - 3 млн"
+    if len(parsed) >= 2 and parsed[0][1] == 1 < parsed[1][1] and parsed[0][0] <= parsed[1][0]:
+        parsed[0] = (parsed[0][0], parsed[1][1])
+    numbers = [round(number * multiplier) for number, multiplier in parsed]
+
+    currency = None
+    for code, markers in _CURRENCIES:
+        if any(marker in lowered for marker in markers):
+            currency = code
+            break
+
+    if not numbers:
+        return None, None, currency
+
+    if len(numbers) >= 2:
+        low, high = sorted(numbers[:2])
+        return low, high, currency
+
+    value = numbers[0]
+    if re.search(r"\bдо\b|\bup to\b", lowered):
+        return None, value, currency
+    if re.search(r"\bот\b|\bfrom\b", lowered):
+        return value, None, currency
+    return value, value, currency
+
+
+def normalize_city(text: str):
+    """Нормализованное название города для индексированного сравнения"""
+    if not text:
+        return None
+    city = _REMOTE_RE.sub("", text)
+    city = re.split(r"[(),/;]", city)[0]
+    city = " ".join(city.split()).casefold().replace("ё", "е")
+    return city or None
+
+
+def normalize_location(text: str):
+    """Разбор локации: (city, is_remote). "Москва (удаленно)" -> ("москва", 1)"""
+    if not text:
+        return None, 0
+    is_remote = 1 if _REMOTE_RE.search(text) else 0
+    return normalize_city(text), is_remote
+
+
+def vacancy_fields(salary: str, location: str):
+    """Структурированные поля заявки в порядке колонок
+    (salary_min, salary_max, salary_currency, city, is_remote)"""
+    return (*parse_salary(salary), *normalize_location(location))
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import time
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+
+import database as db
+import metrics
+from browse_cache import render_card
+from cache import LRUCache
+from matcher import SubscriptionMatcher
+from throttling import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Попыток отправки одного уведомления, после которых оно удаляется из очереди
+MAX_ATTEMPTS = 5
+
+# Как часто проверять очередь, если о новых заявках не сообщили через wake()
+POLL_INTERVAL = 2.0
+
+# Запущенный в этом процессе рассыльщик (для wake() из обработчиков)
+_active = None
+
+
+def wake():
+    """Сообщает рассыльщику этого процесса о новой заявке, не дожидаясь опроса очереди"""
+    if _active is not None:
+        _active.fanout_event.set()
+
+
+async def _wait(event: asyncio.Event, timeout: float):
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    event.clear()
+
+
+class Notifier:
+    """Рассылка уведомлений о новых заявках подписанным рекрутерам.
+
+    Задания рассылки (notification_jobs) и очередь отправки (notification_outbox) хранятся
+    в базе, поэтому большая рассылка не задерживает обработчик и не теряется при перезапуске.
+    Отправка ограничена общим ведром токенов и ведром на каждый чат; ответ 429
+    приостанавливает отправку на retry_after секунд.
+    """
+
+    def __init__(self, bot: Bot, global_rate: float = 25.0, chat_rate: float = 1.0, batch_size: int = 100):
+        self.bot = bot
+        self.chat_rate = chat_rate
+        self.batch_size = batch_size
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self._chat_buckets = LRUCache(maxsize=100000, ttl=max(1.0 / chat_rate, 1.0) * 2)
+        self._paused_until = 0.0
+        self.matcher = SubscriptionMatcher()
+        self._signature = None
+        self.fanout_event = asyncio.Event()
+        self.deliver_event = asyncio.Event()
+        self._tasks = []
+
+    async def start(self):
+        global _active
+        _active = self
+        await self._sync_matcher()
+        logger.info("Индекс подписок построен: %d", len(self.matcher))
+        self._tasks = [
+            asyncio.create_task(self._run(self._fanout_once, self.fanout_event)),
+            asyncio.create_task(self._run(self._deliver_once, self.deliver_event)),
+        ]
+        logger.info("Рассылка уведомлений запущена")
+
+    async def stop(self):
+        global _active
+        if _active is self:
+            _active = None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, step, event: asyncio.Event):
+        while True:
+            try:
+                busy = await step()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Ошибка рассылки уведомлений: %s", e, exc_info=True)
+                busy = False
+            if not busy:
+                await _wait(event, POLL_INTERVAL)
+
+    async def _sync_matcher(self):
+        """Пополнение индекса новыми подписками; после удалений индекс строится заново.
+
+        Подписки добавляются и удаляются в любом процессе, поэтому изменения
+        определяются по (MAX(id), COUNT(*)) таблицы subscriptions.
+        """
+        signature = await db.get_subscriptions_signature()
+        if signature == self._signature:
+            return
+        for row in await db.get_subscriptions_since(self.matcher.last_id):
+            self.matcher.add(row['id'], row['user_id'], row['kind'], row['value'])
+        if len(self.matcher) != signature[1]:
+            self.matcher.load(await db.get_subscriptions_since(0))
+        self._signature = signature
+        metrics.set_gauge("subscription_index_size", len(self.matcher))
+
+    async def _fanout_once(self) -> bool:
+        """Сопоставление новых заявок с подписками и постановка уведомлений в очередь"""
+        jobs = await db.get_notification_jobs(self.batch_size)
+        if not jobs:
+            return False
+
+        await self._sync_matcher()
+        for job in jobs:
+            chat_ids = set()
+            if job['id'] is not None:
+                started = time.perf_counter()
+                chat_ids = self.matcher.match(job)
+                chat_ids.discard(job['company_id'])
+                metrics.observe("subscription_match_seconds", time.perf_counter() - started)
+            await db.enqueue_notifications(job['job_id'], chat_ids)
+            metrics.inc("notifications_enqueued_total", len(chat_ids))
+            if chat_ids:
+                logger.info("Заявка %s: уведомлений в очереди: %d", job['job_id'], len(chat_ids))
+
+        self.deliver_event.set()
+        return True
+
+    def _chat_allows(self, chat_id: int) -> bool:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, 1)
+            self._chat_buckets.set(chat_id, bucket)
+        return bucket.consume()
+
+    async def _send(self, row):
+        """Отправка одного уведомления: None или (время повторной попытки, число попыток)"""
+        await self.global_bucket.wait()
+        try:
+            await self.bot.send_message(
+                row['chat_id'],
+                f"🔔 Новая вакансия по вашей подписке\n\n{render_card(row)}",
+                parse_mode="HTML",
+            )
+        except TelegramRetryAfter as e:
+            self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+            metrics.inc("notifications_total", result="retry_after")
+            return time.time() + e.retry_after, row['attempts']
+        except TelegramForbiddenError:
+            # Пользователь заблокировал бота: подписки больше не нужны
+            await db.delete_user_subscriptions(row['chat_id'])
+            metrics.inc("notifications_total", result="blocked")
+            return None
+        except Exception as e:
+            attempts = row['attempts'] + 1
+            if attempts >= MAX_ATTEMPTS:
+                logger.error("Уведомление %s для %s не отправлено: %s", row['outbox_id'], row['chat_id'], e)
+                metrics.inc("notifications_total", result="failed")
+                return None
+            metrics.inc("notifications_total", result="error")
+            return time.time() + 5 * 2 ** attempts, attempts
+        metrics.inc("notifications_total", result="sent")
+        return None
+
+    async def _deliver_once(self) -> bool:
+        """Отправка очередной пачки уведомлений"""
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+
+        rows = await db.get_due_notifications(time.time(), self.batch_size)
+        metrics.set_gauge("notification_outbox_size", await db.count_pending_notifications())
+        if not rows:
+            return False
+
+        done, retries, sends = [], [], []
+        for row in rows:
+            if row['id'] is None:
+                # Заявку удалили до отправки
+                done.append(row['outbox_id'])
+            elif self._chat_allows(row['chat_id']):
+                sends.append(row)
+            else:
+                retries.append((time.time() + 1.0 / self.chat_rate, row['attempts'], row['outbox_id']))
+
+        results = await asyncio.gather(*(self._send(row) for row in sends))
+        for row, retry in zip(sends, results):
+            if retry is None:
+                done.append(row['outbox_id'])
+            else:
+                retries.append((*retry, row['outbox_id']))
+
+        await db.finish_notifications(done, retries)
+        return bool(done)
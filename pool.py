@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+import aiosqlite
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# PRAGMA, общие для всех соединений пула
+CONNECTION_PRAGMAS = (
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",      # ~16 МБ страничного кэша на соединение
+    "PRAGMA mmap_size = 268435456",    # 256 МБ memory-mapped I/O
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+class ConnectionPool:
+    """Пул долгоживущих соединений SQLite: один писатель и N читателей в режиме WAL"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writer = None
+        self._writer_lock = asyncio.Lock()
+        self._readers = []
+        self._idle_readers = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    @staticmethod
+    async def _pragma(conn, pragma: str):
+        # Результат PRAGMA нужно дочитать, иначе оператор удерживает блокировку
+        async with conn.execute(pragma) as cursor:
+            await cursor.fetchall()
+
+    async def _connect(self, read_only: bool):
+        conn = await aiosqlite.connect(self.path)
+        conn.row_factory = aiosqlite.Row
+        for pragma in CONNECTION_PRAGMAS:
+            await self._pragma(conn, pragma)
+        if read_only:
+            await self._pragma(conn, "PRAGMA query_only = ON")
+        return conn
+
+    async def open(self, readers: int = 4):
+        """Открытие соединений. Писатель открывается первым и переводит базу в WAL"""
+        if self.is_open:
+            return
+
+        self._writer = await self._connect(read_only=False)
+        # Освобождение места порциями (maintenance.py). Действует только на еще пустой файл,
+        # поэтому выполняется до перевода в WAL; существующая база переводится в этот режим
+        # однократным VACUUM при обслуживании
+        await self._pragma(self._writer, "PRAGMA auto_vacuum = INCREMENTAL")
+        await self._pragma(self._writer, "PRAGMA journal_mode = WAL")
+
+        self._idle_readers = asyncio.Queue()
+        for _ in range(max(readers, 1)):
+            conn = await self._connect(read_only=True)
+            self._readers.append(conn)
+            self._idle_readers.put_nowait(conn)
+
+        logger.info("Пул соединений открыт: %s, читателей: %d", self.path, len(self._readers))
+
+    async def close(self):
+        """Закрытие всех соединений пула"""
+        if not self.is_open:
+            return
+
+        # Дожидаемся завершения текущей записи
+        async with self._writer_lock:
+            for conn in self._readers:
+                await conn.close()
+            self._readers = []
+            self._idle_readers = None
+
+            await self._writer.close()
+            self._writer = None
+
+        logger.info("Пул соединений закрыт")
+
+    @asynccontextmanager
+    async def reader(self):
+        """Соединение только для чтения. Не блокируется пишущими транзакциями"""
+        if not self.is_open:
+            raise RuntimeError("Пул соединений не открыт")
+
+        started = time.perf_counter()
+        conn = await self._idle_readers.get()
+        metrics.observe("db_acquire_seconds", time.perf_counter() - started, role="reader")
+        try:
+            yield conn
+        finally:
+            if self._idle_readers is not None:
+                self._idle_readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def writer(self):
+        """Единственное пишущее соединение. Фиксацию транзакции выполняет вызывающий код"""
+        if not self.is_open:
+            raise RuntimeError("Пул соединений не открыт")
+
+        started = time.perf_counter()
+        async with self._writer_lock:
+            metrics.observe("db_acquire_seconds", time.perf_counter() - started, role="writer")
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
@@ -0,0 +1,78 @@
+import json
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+
+from pool import ConnectionPool
+
+
+class SQLiteStorage(BaseStorage):
+    """Хранилище состояний FSM в SQLite (WAL).
+
+    Состояния переживают перезапуск и доступны всем процессам, работающим с одной базой.
+    Таблица fsm_storage создается миграцией (migrations.py).
+    """
+
+    def __init__(self, pool: ConnectionPool):
+        self.pool = pool
+        self.key_builder = DefaultKeyBuilder(with_destiny=True)
+
+    async def _write(self, db, key: str, state: Optional[str], data: Optional[str]):
+        await db.execute("""
+            INSERT INTO fsm_storage (key, state, data) VALUES (?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET state = excluded.state, data = excluded.data
+        """, (key, state, data))
+        # Пустые записи не храним
+        await db.execute(
+            "DELETE FROM fsm_storage WHERE key = ? AND state IS NULL AND data IS NULL", (key,)
+        )
+
+    async def _read(self, db, key: str):
+        async with db.execute("SELECT state, data FROM fsm_storage WHERE key = ?", (key,)) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return None, None
+        return row['state'], row['data']
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self.key_builder.build(key)
+        state = state.state if isinstance(state, State) else state
+        async with self.pool.writer() as db:
+            _, data = await self._read(db, storage_key)
+            await self._write(db, storage_key, state, data)
+            await db.commit()
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        async with self.pool.reader() as db:
+            state, _ = await self._read(db, self.key_builder.build(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        storage_key = self.key_builder.build(key)
+        encoded = json.dumps(dict(data), ensure_ascii=False) if data else None
+        async with self.pool.writer() as db:
+            state, _ = await self._read(db, storage_key)
+            await self._write(db, storage_key, state, encoded)
+            await db.commit()
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        async with self.pool.reader() as db:
+            _, data = await self._read(db, self.key_builder.build(key))
+        return json.loads(data) if data else {}
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> Dict[str, Any]:
+        # Чтение и запись в одной транзакции писателя
+        storage_key = self.key_builder.build(key)
+        async with self.pool.writer() as db:
+            state, current = await self._read(db, storage_key)
+            current = json.loads(current) if current else {}
+            current.update(data)
+            encoded = json.dumps(current, ensure_ascii=False) if current else None
+            await self._write(db, storage_key, state, encoded)
+            await db.commit()
+        return current.copy()
+
+    async def close(self) -> None:
+        # Пул соединений принадлежит database.py и закрывается в main.py
+        pass
@@ -0,0 +1,300 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+import queue as queue_module
+import signal
+import time
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+
+import analytics
+import config
+import database as db
+import metrics
+from log_config import setup_worker_logging
+from maintenance import Maintenance
+from notifier import Notifier
+from storage import SQLiteStorage
+from throttling import ConcurrencyMiddleware
+from writer import GroupCommitWriter
+
+logger = logging.getLogger(__name__)
+
+# Максимум обновлений в очереди одного воркера, после которого прием притормаживает
+WORKER_QUEUE_SIZE = 1000
+
+# Сколько секунд ждать места в очереди воркера, прежде чем отбросить обновление:
+# переполненный воркер не должен останавливать прием для остальных
+DISPATCH_TIMEOUT = 2.0
+
+# Проверка воркеров и минимальный интервал между перезапусками одного воркера
+WATCHDOG_INTERVAL = 5.0
+RESTART_DELAY = 5.0
+
+
+def update_user_id(update: dict):
+    """Идентификатор пользователя из сырого обновления (для распределения по воркерам)"""
+    for event_type, event in update.items():
+        if isinstance(event, dict):
+            user = event.get("from") or event.get("user")
+            if user:
+                return user["id"]
+            chat = event.get("chat") or (event.get("message") or {}).get("chat")
+            if chat:
+                return chat["id"]
+    return update.get("update_id", 0)
+
+
+async def _worker_loop(index: int, queue):
+    """Обработка обновлений в воркере: параллельно для разных пользователей,
+    строго последовательно для одного пользователя"""
+    await db.pool.open(readers=config.DB_READERS)
+    db.write_queue = GroupCommitWriter(config.WRITE_BATCH_SIZE, config.WRITE_BATCH_DELAY)
+    db.write_queue.start(db.pool)
+    bot = Bot(token=config.BOT_TOKEN)
+    dp = Dispatcher(storage=SQLiteStorage(db.pool))
+
+    from handlers import router
+    dp.include_router(router)
+    metrics.setup_middlewares(dp)
+    dp.update.outer_middleware(ConcurrencyMiddleware(
+        config.MAX_CONCURRENT_UPDATES, config.USER_QUEUE_SIZE, config.OVERLOAD_QUEUE_SIZE
+    ))
+    await dp.emit_startup(bot=bot)
+    
+    metrics_server = metrics.MetricsServer(
+        config.METRICS_HOST,
+        config.METRICS_PORT + 1 + index if config.METRICS_PORT else 0,
+        config.METRICS_LOG_INTERVAL,
+    )
+    await metrics_server.start()
+
+    # Рассылку уведомлений и обслуживание базы ведет один воркер
+    notifier = maintenance = None
+    if index == 0:
+        notifier = Notifier(bot, config.NOTIFY_GLOBAL_RATE, config.NOTIFY_CHAT_RATE)
+        await notifier.start()
+        maintenance = Maintenance(config.VACANCY_RETENTION_DAYS, config.MAINTENANCE_HOURS)
+        maintenance.start()
+    analytics.aggregator.start(config.STATS_FLUSH_INTERVAL)
+
+    loop = asyncio.get_running_loop()
+    tails = {}  # user_id -> последняя задача пользователя
+
+    async def process(user_id: int, update: dict, previous):
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        try:
+            await dp.feed_raw_update(bot, update)
+        except Exception as e:
+            logger.error("Воркер %d: ошибка обработки обновления %s: %s",
+                         index, update.get('update_id'), e, exc_info=True)
+        finally:
+            if tails.get(user_id) is asyncio.current_task():
+                del tails[user_id]
+
+    logger.info("Воркер %d запущен", index)
+    try:
+        while True:
+            update = await loop.run_in_executor(None, queue.get)
+            if update is None:
+                break
+            user_id = update_user_id(update)
+            tails[user_id] = asyncio.create_task(process(user_id, update, tails.get(user_id)))
+
+        # Дообрабатываем уже полученные обновления
+        if tails:
+            await asyncio.gather(*tails.values(), return_exceptions=True)
+    finally:
+        await analytics.aggregator.stop()
+        if maintenance is not None:
+            await maintenance.stop()
+        if notifier is not None:
+            await notifier.stop()
+        await metrics_server.stop()
+        await dp.emit_shutdown(bot=bot)
+        await bot.session.close()
+        await db.write_queue.stop()
+        await db.pool.close()
+        logger.info("Воркер %d остановлен", index)
+
+
+def worker_main(index: int, queue, log_queue):
+    """Точка входа процесса-воркера"""
+    # Остановкой управляет супервизор через очередь
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setup_worker_logging(log_queue, config.LOG_LEVEL)
+    asyncio.run(_worker_loop(index, queue))
+
+
+class Supervisor:
+    """Принимает обновления (polling или webhook) и распределяет их по N процессам
+    по user_id, чтобы шаги FSM одного пользователя выполнялись по порядку"""
+
+    def __init__(self, workers: int, log_pipeline):
+        self.workers = workers
+        self.log_pipeline = log_pipeline
+        self._queues = []
+        self._processes = []
+        self._started_at = []
+        self._ctx = None
+        self._log_queue = None
+        self._stop_event = None
+
+    def _spawn(self, index: int):
+        """Новый процесс воркера со своей очередью"""
+        queue = self._ctx.Queue(maxsize=WORKER_QUEUE_SIZE)
+        process = self._ctx.Process(
+            target=worker_main, args=(index, queue, self._log_queue), name=f"bot-worker-{index}"
+        )
+        process.start()
+        return queue, process
+
+    def start_workers(self):
+        self._ctx = multiprocessing.get_context("spawn")
+        self._log_queue = self.log_pipeline.worker_queue(self._ctx)
+        for index in range(self.workers):
+            queue, process = self._spawn(index)
+            self._queues.append(queue)
+            self._processes.append(process)
+            self._started_at.append(time.monotonic())
+        logger.info("Запущено воркеров: %d", self.workers)
+
+    def _restart_if_dead(self, index: int) -> bool:
+        """Перезапуск упавшего воркера; False, если воркер мертв и перезапуск пока отложен"""
+        process = self._processes[index]
+        if process.is_alive():
+            return True
+        if time.monotonic() - self._started_at[index] < RESTART_DELAY:
+            return False
+
+        logger.error("Воркер %s завершился с кодом %s, перезапуск", process.name, process.exitcode)
+        metrics.inc("supervisor_worker_restarts_total", worker=str(index))
+        # Обновления из очереди упавшего воркера теряются: ее некому дочитать
+        old_queue = self._queues[index]
+        old_queue.cancel_join_thread()
+        old_queue.close()
+        self._queues[index], self._processes[index] = self._spawn(index)
+        self._started_at[index] = time.monotonic()
+        return True
+
+    async def _watchdog(self):
+        while True:
+            await asyncio.sleep(WATCHDOG_INTERVAL)
+            for index in range(self.workers):
+                self._restart_if_dead(index)
+
+    def stop_workers(self, timeout: float = 30.0):
+        for queue, process in zip(self._queues, self._processes):
+            if not process.is_alive():
+                continue
+            try:
+                queue.put_nowait(None)
+            except queue_module.Full:
+                logger.warning("Очередь воркера %s переполнена, принудительная остановка", process.name)
+                process.terminate()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                logger.warning("Воркер %s не завершился вовремя, принудительная остановка", process.name)
+                process.terminate()
+
+    async def dispatch(self, update: dict):
+        """Передача обновления воркеру, отвечающему за пользователя. Если воркер мертв
+        или его очередь не освобождается DISPATCH_TIMEOUT секунд, обновление отбрасывается"""
+        index = update_user_id(update) % self.workers
+        if not self._restart_if_dead(index):
+            metrics.inc("supervisor_dropped_updates_total", reason="dead_worker")
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(self._queues[index].put, update, timeout=DISPATCH_TIMEOUT)
+            )
+        except queue_module.Full:
+            logger.warning("Очередь воркера %d переполнена, обновление %s отброшено",
+                           index, update.get("update_id"))
+            metrics.inc("supervisor_dropped_updates_total", reason="queue_full")
+
+    async def _poll(self, bot: Bot, allowed_updates: list):
+        offset = None
+        delay = 1.0
+        while True:
+            try:
+                updates = await bot.get_updates(
+                    offset=offset, timeout=10, allowed_updates=allowed_updates
+                )
+                delay = 1.0
+            except Exception as e:
+                logger.error("Ошибка получения обновлений: %s", e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 1.5, 5.0)
+                continue
+
+            for update in updates:
+                await self.dispatch(update.model_dump(mode="json", exclude_none=True, by_alias=True))
+                offset = update.update_id + 1
+
+    async def _serve_webhook(self, bot: Bot, allowed_updates: list):
+        async def handle(request: web.Request):
+            if config.WEBHOOK_SECRET and \
+                    request.headers.get("X-Telegram-Bot-Api-Secret-Token") != config.WEBHOOK_SECRET:
+                return web.Response(status=401)
+            await self.dispatch(await request.json())
+            return web.Response()
+
+        app = web.Application()
+        app.router.add_post(config.WEBHOOK_PATH, handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host=config.WEBAPP_HOST, port=config.WEBAPP_PORT).start()
+
+        if config.WEBHOOK_URL:
+            await bot.set_webhook(
+                url=config.WEBHOOK_URL.rstrip("/") + config.WEBHOOK_PATH,
+                secret_token=config.WEBHOOK_SECRET,
+                allowed_updates=allowed_updates,
+            )
+        logger.info("Супервизор принимает webhook на %s:%s", config.WEBAPP_HOST, config.WEBAPP_PORT)
+        try:
+            await self._stop_event.wait()
+        finally:
+            await runner.cleanup()
+
+    async def run(self):
+        self._stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stop_event.set)
+
+        # Схема БД создается один раз до запуска воркеров
+        await db.pool.open(readers=1)
+        await db.init_db()
+        await db.pool.close()
+
+        from handlers import router
+        allowed_updates = router.resolve_used_update_types()
+
+        bot = Bot(token=config.BOT_TOKEN)
+        self.start_workers()
+        watchdog = asyncio.create_task(self._watchdog())
+        # Перезапуски воркеров и отброшенные обновления; воркеры отдают метрики на METRICS_PORT + 1 + N
+        metrics_server = metrics.MetricsServer(config.METRICS_HOST, config.METRICS_PORT, 0)
+        await metrics_server.start()
+        try:
+            if config.BOT_MODE == "webhook":
+                await self._serve_webhook(bot, allowed_updates)
+            else:
+                logger.info("Супервизор запущен в режиме polling")
+                poll_task = asyncio.create_task(self._poll(bot, allowed_updates))
+                await self._stop_event.wait()
+                # Неподтвержденные обновления Telegram выдаст повторно при следующем запуске
+                poll_task.cancel()
+                await asyncio.gather(poll_task, return_exceptions=True)
+        finally:
+            watchdog.cancel()
+            await asyncio.gather(watchdog, return_exceptions=True)
+            await metrics_server.stop()
+            await bot.session.close()
+            await loop.run_in_executor(None, self.stop_workers)
@@ -0,0 +1,248 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import CallbackQuery, Message, TelegramObject, Update
+
+import config
+import metrics
+from cache import LRUCache
+
+# Листание: в среднем нажатий в секунду на пользователя и допустимая серия подряд
+PAGINATION_RATE = 3.0
+PAGINATION_BURST = 8
+
+# Нажатие, прождавшее дольше, устарело: Telegram уже не примет ответ на него
+CALLBACK_STALE_AFTER = 10.0
+
+BUSY_TEXT = "⏳ Бот перегружен, повторите через несколько секунд"
+
+
+class TokenBucket:
+    """Ведро токенов: rate пополнений в секунду, не больше capacity в запасе"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def consume(self, tokens: float = 1) -> bool:
+        """Списание токенов без ожидания; False, если их не хватает"""
+        self._refill()
+        if self.tokens < tokens:
+            return False
+        self.tokens -= tokens
+        return True
+
+    async def wait(self, tokens: float = 1):
+        """Ожидание, пока накопится нужное количество токенов"""
+        while not self.consume(tokens):
+            await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+# Последнее отправленное содержимое сообщений с листанием: (chat_id, message_id) -> (text, markup)
+rendered_pages = LRUCache(maxsize=20000, ttl=3600)
+
+
+def remember_rendered(message: Message, text: str, reply_markup=None):
+    """Запоминает содержимое, отправленное в сообщение"""
+    rendered_pages.set((message.chat.id, message.message_id), (text, reply_markup))
+
+
+async def edit_if_changed(message: Message, text: str, reply_markup=None, **kwargs) -> bool:
+    """Редактирование сообщения, только если текст или клавиатура изменились"""
+    key = (message.chat.id, message.message_id)
+    if rendered_pages.get(key) == (text, reply_markup):
+        metrics.inc("pagination_edits_total", result="unchanged")
+        return False
+    try:
+        await message.edit_text(text, reply_markup=reply_markup, **kwargs)
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
+        metrics.inc("pagination_edits_total", result="not_modified")
+    else:
+        metrics.inc("pagination_edits_total", result="edited")
+    rendered_pages.set(key, (text, reply_markup))
+    return True
+
+
+class PaginationMiddleware(BaseMiddleware):
+    """Ограничение частоты нажатий кнопок листания: сверх лимита ведра токенов нажатия
+    отклоняются. Повторные нажатия в одном сообщении схлопывает ConcurrencyMiddleware
+    """
+
+    def __init__(self, prefixes=("page_", "spage_"), rate: float = PAGINATION_RATE,
+                 burst: int = PAGINATION_BURST, throttle: bool = True):
+        self.prefixes = tuple(prefixes)
+        self.throttle = throttle
+        self.rate = rate
+        self.burst = burst
+        self._buckets = LRUCache(maxsize=100000, ttl=max(burst / rate, 1.0) * 2)
+
+    def _allow(self, user_id: int) -> bool:
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst)
+        # Перезапись продлевает время жизни ведра активного пользователя
+        self._buckets.set(user_id, bucket)
+        return bucket.consume()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not self.throttle or not isinstance(event, CallbackQuery) \
+                or not (event.data or "").startswith(self.prefixes):
+            return await handler(event, data)
+
+        if not self._allow(event.from_user.id):
+            metrics.inc("pagination_callbacks_total", result="throttled")
+            await event.answer("Не так быстро ⏳")
+            return None
+
+        metrics.inc("pagination_callbacks_total", result="processed")
+        return await handler(event, data)
+
+
+class _UserQueue:
+    """Очередь обновлений одного пользователя"""
+
+    __slots__ = ("lock", "pending", "waiting", "callbacks")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0  # в очереди вместе с выполняемым
+        self.waiting = 0  # только ожидающие
+        self.callbacks = {}  # ключ нажатия -> последнее ожидающее нажатие
+
+
+class ConcurrencyMiddleware(BaseMiddleware):
+    """Ограничение параллельной обработки обновлений и сброс нагрузки.
+
+    Обновления одного пользователя выполняются строго по очереди; всего одновременно
+    выполняется не больше max_concurrent обработчиков. Ожидающее нажатие листания заменяется
+    более новым в том же сообщении, нажатие идемпотентной кнопки ("закрыть", "показать контакт") -
+    таким же; остальные нажатия выполняются все по порядку. Если у пользователя уже ждут user_queue_size обновлений (выполняемое не в счет)
+    или всего ждут overload_queue_size, нажатия получают ответ "бот перегружен", а inline-запросы
+    отбрасываются. Сообщения не отбрасываются никогда и всегда ставятся в очередь пользователя.
+    """
+
+    def __init__(self, max_concurrent: int = config.MAX_CONCURRENT_UPDATES,
+                 user_queue_size: int = config.USER_QUEUE_SIZE,
+                 overload_queue_size: int = config.OVERLOAD_QUEUE_SIZE,
+                 coalesce_prefixes=("page_", "spage_", "mypage_"), idempotent_prefixes=("close", "contact_")):
+        self.max_concurrent = max_concurrent
+        self.user_queue_size = user_queue_size
+        self.overload_queue_size = overload_queue_size
+        self.coalesce_prefixes = tuple(coalesce_prefixes)
+        self.idempotent_prefixes = tuple(idempotent_prefixes)
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._users = {}  # user_id -> _UserQueue
+        self.waiting = 0
+        self.running = 0
+
+    def _report(self):
+        metrics.set_gauge("updates_running", self.running)
+        metrics.set_gauge("updates_waiting", self.waiting)
+        metrics.set_gauge("update_user_queues", len(self._users))
+
+    def _callback_key(self, event):
+        """Ключ схлопывания нажатия или None: неидемпотентные кнопки (отметка заявки,
+        удаление) выполняются столько раз, сколько нажаты"""
+        if event.message is None:
+            return None
+        key = (event.message.chat.id, event.message.message_id)
+        data = event.data or ""
+        if data.startswith(self.coalesce_prefixes):
+            return key
+        if data.startswith(self.idempotent_prefixes):
+            return key + (data,)
+        return None
+
+    async def _shed(self, event, reason: str):
+        """Отказ в обработке: нажатию нужно ответить, иначе у кнопки крутятся часы"""
+        metrics.inc("updates_shed_total", reason=reason)
+        if isinstance(event, CallbackQuery):
+            try:
+                await event.answer(BUSY_TEXT if reason in ("user_queue", "overload") else None)
+            except TelegramBadRequest:
+                # Слишком старое нажатие
+                pass
+        return None
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        inner = event.event if isinstance(event, Update) else event
+        if user is None:
+            async with self._semaphore:
+                return await handler(event, data)
+
+        queue = self._users.get(user.id)
+        if not isinstance(inner, Message):
+            if self.waiting >= self.overload_queue_size:
+                return await self._shed(inner, "overload")
+            if queue is not None and queue.waiting >= self.user_queue_size:
+                return await self._shed(inner, "user_queue")
+        if queue is None:
+            queue = self._users[user.id] = _UserQueue()
+
+        is_callback = isinstance(inner, CallbackQuery)
+        key = self._callback_key(inner) if is_callback else None
+        if key is not None:
+            queue.callbacks[key] = inner
+
+        queue.pending += 1
+        queue.waiting += 1
+        self.waiting += 1
+        self._report()
+        enqueued_at = time.monotonic()
+        waiting = True
+        try:
+            async with queue.lock, self._semaphore:
+                queue.waiting -= 1
+                self.waiting -= 1
+                waiting = False
+                waited = time.monotonic() - enqueued_at
+                metrics.observe("update_queue_wait_seconds", waited)
+
+                if key is not None:
+                    if queue.callbacks.get(key) is not inner:
+                        return await self._shed(inner, "superseded")
+                    del queue.callbacks[key]
+                if is_callback and waited > CALLBACK_STALE_AFTER:
+                    return await self._shed(inner, "stale")
+
+                self.running += 1
+                self._report()
+                try:
+                    return await handler(event, data)
+                finally:
+                    self.running -= 1
+        finally:
+            if waiting:
+                queue.waiting -= 1
+                self.waiting -= 1
+                if key is not None and queue.callbacks.get(key) is inner:
+                    del queue.callbacks[key]
+            queue.pending -= 1
+            if queue.pending == 0:
+                self._users.pop(user.id, None)
+            self._report()
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitWriter:
+    """Очередь записей с групповой фиксацией (group commit).
+
+    Операция - корутина operation(conn), выполняющая запросы на пишущем соединении
+    и возвращающая результат (например, lastrowid). Единственная фоновая задача
+    забирает из очереди до max_batch операций, накопившихся за max_delay секунд,
+    выполняет их в одной транзакции - каждую в своей точке сохранения, чтобы ошибка
+    одной не откатывала остальные, - и фиксирует их одним COMMIT. Вызывающий код
+    получает результат своей операции после фиксации.
+    """
+
+    def __init__(self, max_batch: int = 64, max_delay: float = 0.005):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = None
+        self._task = None
+        self._pool = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self, pool):
+        self._pool = pool
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._loop())
+        logger.info("Групповая фиксация записей: до %d операций за %.0f мс",
+                    self.max_batch, self.max_delay * 1000)
+
+    async def stop(self):
+        """Остановка после записи уже поставленных в очередь операций"""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        await self._queue.put(None)
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def submit(self, operation):
+        """Постановка операции в очередь; возвращает ее результат после COMMIT"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((operation, future))
+        return await future
+
+    async def _collect(self, first):
+        """Пачка операций: первая и все, что успели поступить за max_delay"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(
+                    self._queue.get(), timeout
+                )
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+            if item is None:
+                # Сигнал остановки: дописываем пачку и выходим
+                self._queue.put_nowait(None)
+                break
+            batch.append(item)
+        return batch
+
+    async def _loop(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = await self._collect(item)
+            started = time.perf_counter()
+            try:
+                await self._commit(batch)
+            except Exception as e:
+                logger.error("Ошибка групповой фиксации (%d операций): %s", len(batch), e)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            metrics.observe("db_group_commit_seconds", time.perf_counter() - started)
+            metrics.observe("db_group_commit_size", len(batch))
+
+    async def _commit(self, batch):
+        results = []
+        async with self._pool.writer() as conn:
+            await conn.execute("BEGIN IMMEDIATE")
+            for operation, future in batch:
+                if future.cancelled():
+                    continue
+                await conn.execute("SAVEPOINT operation")
+                try:
+                    result = await operation(conn)
+                except Exception as e:
+                    await conn.execute("ROLLBACK TO operation")
+                    await conn.execute("RELEASE operation")
+                    future.set_exception(e)
+                    continue
+                await conn.execute("RELEASE operation")
+                results.append((future, result))
+            await conn.commit()
+
+        for future, result in results:
+            if not future.done():
+                future.set_result(result)
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0